@@ -0,0 +1,299 @@
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+# Everything runs against a fresh scratch tree with the simulated executor, never the live queue.
+# The scheduler modules read their configuration at import time, so __main__ points the environment
+# at the scratch tree first and imports them afterwards.
+BENCH_DIR = None
+FORK = multiprocessing.get_context("fork")  # children inherit that setup instead of importing afresh
+
+DEFAULT_ROWS = [1000, 10000, 100000]
+DEFAULT_PENDING_RATIOS = [0.1, 0.5]
+DEFAULT_BATCH_SIZES = [10, 200]
+POOL_SIZE = 500  # real STIL files the synthetic rows point at
+BENCH_CONFIG = {
+    "executor": {"backend": "simulated", "mean_sec": 0.0, "failure_rate": 0.0, "output_files": 1, "output_bytes": 64,
+                 "seed": 1},
+    "notify": {"default": {"sinks": []}},
+}
+QUIET = open(os.devnull, "w")  # scheduler and submit output is not part of the measurement
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def summarize(name, seconds, **params):
+    ms = [s * 1000 for s in seconds]
+    return {
+        "bench": name,
+        **params,
+        "runs": len(ms),
+        "mean_ms": round(statistics.mean(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+def prepare_bench_dir(task_sec=0.0):
+    os.makedirs(os.path.join(BENCH_DIR, "stil"), exist_ok=True)
+    shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), "normal.py"),
+                os.path.join(BENCH_DIR, "normal.py"))
+    with open(config.CONFIG_FILE, "w") as f:
+        json.dump({**BENCH_CONFIG, "executor": {**BENCH_CONFIG["executor"], "mean_sec": task_sec}}, f)
+    pool = []
+    for i in range(POOL_SIZE):
+        path = os.path.join(BENCH_DIR, "stil", f"pat{i:04d}.stil.gz")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(b"\x1f\x8b" + os.urandom(64 + i))
+        pool.append(path)
+    return pool
+
+def reset_queue(queue_file):
+    for path in (queue_file, queue_store.counters_file(queue_file), queue_store.dispatch_log_file(queue_file)):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+def generate_queue(queue_file, rows, pending_ratio, batch_size, pool, seed=0):
+    # Finished history with PENDING rows spread through it, as in a long-lived queue.
+    # Paths repeat across batches but never within one (batch_size <= len(pool)).
+    reset_queue(queue_file)
+    rng = random.Random(seed)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with open(queue_file, "w", newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(queue_store.QUEUE_HEADER)
+        for i in range(rows):
+            batch = i // batch_size
+            status = "PENDING" if rng.random() < pending_ratio else rng.choice(("COMPLETE", "COMPLETE", "FAILED"))
+            writer.writerow([now, "bench", "bench@rivosinc.com", f"bench_{batch:06d}", pool[i % batch_size], "",
+                             status, "", 0, "", "", "", "", ""])
+    queue_store.read_counters(queue_file)  # the sidecar is warm in a running system
+
+def bench_submit(queue_file, pool, rows, pending_ratio, batch_size, paths=100, repeats=10):
+    generate_queue(queue_file, rows, pending_ratio, batch_size, pool)
+    input_csv = os.path.join(BENCH_DIR, "submit_input.csv")
+    with open(input_csv, "w") as f:
+        f.write("STIL_Path\n" + "\n".join(pool[:paths]) + "\n")
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(QUIET):
+            stilsubmit.validate_and_append(input_csv, queue_file=queue_file)
+        seconds.append(time.perf_counter() - start)
+    return summarize("submit", seconds, rows=rows, pending_ratio=pending_ratio, batch_size=batch_size, paths=paths)
+
+def bench_claim(queue_file, pool, rows, pending_ratio, batch_size, claims=20):
+    # Claim = from the call until the executor starts; cycle = the whole dispatch including the result update
+    generate_queue(queue_file, rows, pending_ratio, batch_size, pool)
+    claim_seconds, cycle_seconds = [], []
+    run_task = run_scheduler_mission.run_stil_command
+
+    def timed_run(*args, **kwargs):
+        claim_seconds.append(time.perf_counter() - start)
+        return run_task(*args, **kwargs)
+
+    run_scheduler_mission.run_stil_command = timed_run
+    try:
+        for _ in range(claims):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(QUIET):
+                run_scheduler_mission.process_first_pending_task()
+            cycle_seconds.append(time.perf_counter() - start)
+    finally:
+        run_scheduler_mission.run_stil_command = run_task
+    params = dict(rows=rows, pending_ratio=pending_ratio, batch_size=batch_size)
+    return [summarize("claim", claim_seconds, **params), summarize("dispatch_cycle", cycle_seconds, **params)]
+
+def _submitter(queue_file, paths, submits, results):
+    seconds = []
+    with contextlib.redirect_stdout(QUIET):
+        for i in range(submits):
+            start = time.perf_counter()
+            stilsubmit.submit_batch(paths, name=f"contend{os.getpid()}_{i}", queue_file=queue_file)
+            seconds.append(time.perf_counter() - start)
+    results.put(seconds)
+
+def bench_contention(queue_file, pool, rows, submitters, submits=20, paths=10):
+    # N processes appending batches at once; latency includes the wait for the queue lock
+    generate_queue(queue_file, rows, 0.1, 50, pool)
+    results = FORK.Queue()
+    procs = [FORK.Process(target=_submitter, args=(queue_file, pool[:paths], submits, results))
+             for _ in range(submitters)]
+    start = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    seconds = [s for _ in procs for s in results.get()]
+    for proc in procs:
+        proc.join()
+    wall = time.perf_counter() - start
+    result = summarize("contention", seconds, rows=rows, submitters=submitters, paths=paths)
+    result["submits_per_sec"] = round(len(seconds) / wall, 2)
+    return result
+
+def _worker(deadline):
+    run_scheduler_mission.WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+    with contextlib.redirect_stdout(QUIET):
+        while time.time() < deadline:
+            counts = queue_store.read_counters(run_scheduler_mission.QUEUE_FILE)
+            if not sum(c.get("pending", 0) for c in counts.values()):
+                return
+            run_scheduler_mission.process_first_pending_task()
+
+def completed_runs(log_file):
+    # COMPLETE rows per task in the execution log; more than one means a task was executed and published twice
+    runs = Counter()
+    with contextlib.suppress(FileNotFoundError), open(log_file, newline='') as f:
+        for row in csv.DictReader(f):
+            if row.get("Status") == "COMPLETE":
+                runs[(row["BatchID"], row["STIL_Path"])] += 1
+    return runs
+
+def bench_end_to_end(queue_file, pool, tasks, workers, task_sec=0.0, timeout=600):
+    generate_queue(queue_file, tasks, 1.0, min(50, len(pool)), pool)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(config.EXECUTION_LOG_FILE)
+    procs = [FORK.Process(target=_worker, args=(time.time() + timeout,)) for _ in range(workers)]
+    start = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    wall = time.perf_counter() - start
+    counts = queue_store.read_counters(queue_file)
+    done = sum(c.get("complete", 0) + c.get("failed", 0) for c in counts.values())
+    twice = sum(1 for n in completed_runs(config.EXECUTION_LOG_FILE).values() if n > 1)
+    return {"bench": "end_to_end", "tasks": tasks, "workers": workers, "task_sec": task_sec, "finished": done,
+            "completed_twice": twice, "wall_sec": round(wall, 3), "tasks_per_sec": round(done / wall, 2)}
+
+def remove_bench_dir(bench_dir):
+    # The scratch tree, and the host-local lock, disk cache and scratch dir the scheduler keeps for it
+    import disk_admission
+    import run_scheduler_mission
+    import staging
+    shutil.rmtree(bench_dir, ignore_errors=True)
+    shutil.rmtree(staging.LOCAL_SCRATCH_DIR, ignore_errors=True)
+    for path in (disk_admission.DISK_CACHE_FILE, run_scheduler_mission.LOCK_FILE):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)), universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def result_key(result):
+    return json.dumps({k: v for k, v in result.items()
+                       if k not in ("runs", "mean_ms", "p50_ms", "p95_ms", "max_ms", "submits_per_sec",
+                                    "wall_sec", "tasks_per_sec", "finished", "completed_twice")}, sort_keys=True)
+
+def compare(results, baseline_file, tolerance):
+    # Regressions: p50 latency up, or throughput down, by more than `tolerance` (a fraction)
+    with open(baseline_file) as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        old = baseline.get(result_key(result))
+        if old is None:
+            continue
+        for metric, higher_is_worse in (("p50_ms", True), ("submits_per_sec", False), ("tasks_per_sec", False)):
+            if metric not in result or not old.get(metric):
+                continue
+            change = result[metric] / old[metric] - 1
+            if (change if higher_is_worse else -change) > tolerance:
+                regressions.append(f"{result_key(result)} {metric}: {old[metric]} -> {result[metric]}")
+    return regressions
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark the task queue path against synthetic queues")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="Queue sizes (e.g. 1000 1000000)")
+    parser.add_argument("--pending", type=float, nargs="+", default=DEFAULT_PENDING_RATIOS, help="PENDING ratios")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=DEFAULT_BATCH_SIZES, help="Tasks per batch")
+    parser.add_argument("--submitters", type=int, nargs="+", default=[1, 4, 8], help="Concurrent submitters")
+    parser.add_argument("--claims", type=int, default=20, help="Dispatches measured per queue")
+    parser.add_argument("--tasks", type=int, default=500, help="Tasks in the end-to-end run")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="Workers in the end-to-end run")
+    parser.add_argument("--task-sec", type=float, default=0.0,
+                        help="Mean simulated ategen run time (0 measures pure scheduler overhead)")
+    parser.add_argument("--only", choices=["submit", "claim", "contention", "end_to_end"], action="append",
+                        help="Run only these benchmarks (repeatable)")
+    parser.add_argument("--out", default="bench_results.json", help="Results file (JSON)")
+    parser.add_argument("--compare", help="Earlier results file; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against --compare")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory")
+    args = parser.parse_args()
+
+    if max(args.batch_size) > POOL_SIZE:
+        parser.error(f"--batch-size must be at most {POOL_SIZE}")
+    only = set(args.only or ["submit", "claim", "contention", "end_to_end"])
+
+    BENCH_DIR = os.environ["STIL_MANAGER_DIR"] = tempfile.mkdtemp(prefix="stil_bench_")
+    os.environ["STIL_RELEASE_DIR"] = os.path.join(BENCH_DIR, "release")
+    results = []
+    try:
+        import config
+        import queue_store
+        import run_scheduler_mission
+        import stilsubmit
+
+        pool = prepare_bench_dir(args.task_sec)
+        queue_file = run_scheduler_mission.QUEUE_FILE
+        print(f"[INFO] Benchmarking in {BENCH_DIR}")
+        for rows in args.rows:
+            for pending_ratio in args.pending:
+                for batch_size in args.batch_size:
+                    if "submit" in only:
+                        results.append(bench_submit(queue_file, pool, rows, pending_ratio, batch_size))
+                        print(f"[INFO] {results[-1]}")
+                    if "claim" in only:
+                        results.extend(bench_claim(queue_file, pool, rows, pending_ratio, batch_size, args.claims))
+                        print(f"[INFO] {results[-2]}\n[INFO] {results[-1]}")
+            if "contention" in only:
+                for submitters in args.submitters:
+                    results.append(bench_contention(queue_file, pool, rows, submitters))
+                    print(f"[INFO] {results[-1]}")
+        if "end_to_end" in only:
+            for workers in args.workers:
+                results.append(bench_end_to_end(queue_file, pool, args.tasks, workers, args.task_sec))
+                print(f"[INFO] {results[-1]}")
+    finally:
+        if not args.keep:
+            remove_bench_dir(BENCH_DIR)
+
+    report = {
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "host": socket.gethostname(),
+        "python": platform.python_version(),
+        "commit": git_commit(),
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"[INFO] Wrote {len(results)} result(s) to {args.out}")
+    doubled = [result for result in results if result.get("completed_twice")]
+    for result in doubled:
+        print(f"[ERROR] {result['completed_twice']} task(s) completed more than once with {result['workers']} worker(s)")
+    if doubled:
+        sys.exit(1)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"[ERROR] Regression: {line}")
+        sys.exit(1 if regressions else 0)
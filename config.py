@@ -0,0 +1,22 @@
+import hashlib
+import json
+import os
+
+DEFAULT_BASE_DIR = "/work/kimhuang/1_Python/8_stilManager"
+BASE_DIR = os.environ.get("STIL_MANAGER_DIR", DEFAULT_BASE_DIR)
+# Host-local state (scheduler lock, disk cache, local scratch) lives in /tmp; a tree selected through
+# STIL_MANAGER_DIR, such as a benchmark's, gets its own names there so it never shares them with the default one
+LOCAL_SUFFIX = ("" if BASE_DIR == DEFAULT_BASE_DIR
+                else f"_{hashlib.sha1(os.path.abspath(BASE_DIR).encode()).hexdigest()[:8]}")
+CONFIG_FILE = os.path.join(BASE_DIR, "repack_config.json")
+EXECUTION_LOG_FILE = os.path.join(BASE_DIR, "execution_log.csv")
+OUTPUT_DIR = os.environ.get("STIL_RELEASE_DIR", "/projects/ga0/patterns/release_pattern")
+MAX_LICENSE = 1  # concurrent ategen runs allowed by the license server
+
+def load_config():
+    try:
+        with open(CONFIG_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Failed to read {CONFIG_FILE}: {e}")
+        return {}
@@ -0,0 +1,128 @@
+import heapq
+import os
+import statistics
+import time
+from datetime import datetime
+import log_store
+from config import EXECUTION_LOG_FILE
+
+HISTORY_SAMPLE_BYTES = 2 * 1024 * 1024  # recent execution history used for estimates
+DEFAULT_TASK_SEC = 600  # when there is no usable history
+MIN_TASK_SEC = 30  # license checkout and setup alone take about this long
+DEADLINE_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+def parse_deadline(text):
+    # Returns the normalized "YYYY-mm-dd HH:MM" form; a bare date means the end of that day
+    for fmt in DEADLINE_FORMATS:
+        try:
+            when = datetime.strptime(text.strip(), fmt)
+        except ValueError:
+            continue
+        if fmt == "%Y-%m-%d":
+            when = when.replace(hour=23, minute=59)
+        return when.strftime("%Y-%m-%d %H:%M")
+    raise ValueError(f"Invalid deadline '{text}': use 'YYYY-mm-dd HH:MM'")
+
+def task_deadline(row):
+    # Epoch seconds, or None for tasks without a deadline (and rows older than the column)
+    if len(row) > 9 and row[9]:
+        try:
+            return datetime.strptime(row[9], "%Y-%m-%d %H:%M").timestamp()
+        except ValueError:
+            return None
+    return None
+
+def duration_estimator(log_file=None):
+    # Seconds per input byte from recent successful runs; runs are dominated by pattern size
+    log_file = log_file or EXECUTION_LOG_FILE
+    rates, durations = [], []
+    for row in log_store.recent_execution_rows(log_file, HISTORY_SAMPLE_BYTES):
+        if row.get("Status") != "COMPLETE":
+            continue
+        try:
+            duration = float(row["Duration_sec"])
+            input_bytes = int(row.get("InputBytes") or 0)
+        except (KeyError, TypeError, ValueError):
+            continue
+        durations.append(duration)
+        if input_bytes > 0:
+            rates.append(duration / input_bytes)
+    rate = statistics.median(rates) if rates else None
+    typical = statistics.median(durations) if durations else DEFAULT_TASK_SEC
+
+    def estimate(stil_path):
+        if rate is None:
+            return typical
+        try:
+            return max(MIN_TASK_SEC, rate * os.path.getsize(stil_path))
+        except OSError:
+            return typical
+
+    return estimate
+
+def batch_workloads(tasks, estimate, statuses=("PENDING",)):
+    # {batch_id: [deadline, remaining seconds]} for batches with a deadline
+    workloads = {}
+    for row in tasks:
+        if len(row) < 7 or row[6] not in statuses:
+            continue
+        deadline = task_deadline(row)
+        if deadline is None:
+            continue
+        entry = workloads.setdefault(row[3], [deadline, 0.0])
+        entry[0] = min(entry[0], deadline)
+        entry[1] += estimate(row[4])
+    return workloads
+
+def moore_hodgson(workloads, start, licenses=1):
+    # Order that maximizes the number of batches finishing on time: earliest deadline first,
+    # and whenever the running sequence overshoots, the longest batch so far moves to the end.
+    # Returns (on_time, late), each a list of batch IDs in dispatch order.
+    sequence = sorted(workloads, key=lambda batch_id: workloads[batch_id][0])
+    kept, longest, late = [], [], []
+    elapsed = 0.0
+    for batch_id in sequence:
+        deadline, work = workloads[batch_id]
+        kept.append(batch_id)
+        heapq.heappush(longest, (-work, batch_id))
+        elapsed += work / licenses
+        if start + elapsed > deadline:
+            work, dropped = heapq.heappop(longest)
+            elapsed += work / licenses  # work is negated on the heap
+            kept.remove(dropped)
+            late.append(dropped)
+    late.sort(key=lambda batch_id: workloads[batch_id][0])
+    return kept, late
+
+def next_by_deadline(tasks, eligible=None, estimate=None, licenses=1, now=None, debug=False):
+    # Pending task of the first batch in Moore-Hodgson order that has an eligible task;
+    # None means no deadline batch can be served and the caller falls back to its usual order
+    estimate = estimate or duration_estimator()
+    workloads = batch_workloads(tasks, estimate)
+    if not workloads:
+        return None
+    on_time, late = moore_hodgson(workloads, now or time.time(), licenses)
+    if debug:
+        print(f"[DEBUG] Deadline order: on time {on_time}, late {late}")
+    waiting = {}
+    for row in tasks:
+        if len(row) >= 7 and row[6] == "PENDING" and row[3] in workloads:
+            waiting.setdefault(row[3], []).append(row)
+    for batch_id in on_time + late:
+        row = next((row for row in waiting[batch_id] if eligible is None or eligible(row)), None)
+        if row is not None:
+            return row
+    return None
+
+def projected_finish(tasks, batch_id, estimate=None, licenses=1, now=None):
+    # Completion estimate for `batch_id` when deadline batches run first in Moore-Hodgson order.
+    # Returns (finish epoch, on_time).
+    estimate = estimate or duration_estimator()
+    now = now or time.time()
+    workloads = batch_workloads(tasks, estimate, ("PENDING", "RUNNING"))
+    if batch_id not in workloads:
+        return None, True
+    on_time, late = moore_hodgson(workloads, now, licenses)
+    order = on_time + late
+    finish = now + sum(workloads[b][1] for b in order[:order.index(batch_id) + 1]) / licenses
+    return finish, batch_id in on_time
@@ -0,0 +1,119 @@
+import json
+import os
+import statistics
+import time
+import log_store
+from config import LOCAL_SUFFIX
+
+DISK_CACHE_FILE = f"/tmp/stil_disk_cache{LOCAL_SUFFIX}.json"  # shared by the short-lived cron invocations
+STATVFS_TTL = 60  # seconds
+RATIO_TTL = 3600  # seconds
+RATIO_SAMPLE_BYTES = 1024 * 1024  # only recent execution history is sampled
+DEFAULT_OUTPUT_RATIO = 4.0  # output bytes per input byte when there is no history
+SAFETY_FACTOR = 1.5
+MIN_FREE_BYTES = 1024 * 1024 * 1024  # always left free on every filesystem
+LOG_HEADROOM_BYTES = 50 * 1024 * 1024
+
+_memory_cache = None
+
+def _load_cache():
+    global _memory_cache
+    if _memory_cache is None:
+        try:
+            with open(DISK_CACHE_FILE) as f:
+                _memory_cache = json.load(f)
+        except (OSError, ValueError):
+            _memory_cache = {}
+        if not isinstance(_memory_cache, dict):
+            _memory_cache = {}
+    return _memory_cache
+
+def _cached(cache, key, field, ttl):
+    # The value of a fresh, well-formed entry, else None; the file is shared and may be from another version
+    entry = cache.get(key)
+    if (isinstance(entry, dict) and isinstance(entry.get("at"), (int, float))
+            and isinstance(entry.get(field), (int, float)) and time.time() - entry["at"] < ttl):
+        return entry[field]
+    return None
+
+def _store_cache(cache):
+    tmp = f"{DISK_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, DISK_CACHE_FILE)
+    except OSError as e:
+        print(f"[WARN] Failed to write disk cache {DISK_CACHE_FILE}: {e}")
+
+def existing_parent(path):
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return path
+
+def free_bytes(path, debug=False):
+    cache = _load_cache()
+    key = f"statvfs:{path}"
+    free = _cached(cache, key, "free", STATVFS_TTL)
+    if free is not None:
+        return free
+    st = os.statvfs(existing_parent(path))
+    free = st.f_bavail * st.f_frsize
+    cache[key] = {"at": time.time(), "free": free}
+    _store_cache(cache)
+    if debug:
+        print(f"[DEBUG] statvfs {path}: {free / 1024 / 1024 / 1024:.2f}GB free")
+    return free
+
+def reserve(path, nbytes):
+    # Count space promised to a dispatched task against the cached free value
+    cache = _load_cache()
+    if _cached(cache, f"statvfs:{path}", "free", STATVFS_TTL) is not None:
+        cache[f"statvfs:{path}"]["free"] -= nbytes
+        _store_cache(cache)
+
+def output_ratio(log_file, debug=False):
+    cache = _load_cache()
+    ratio = _cached(cache, f"ratio:{log_file}", "ratio", RATIO_TTL)
+    if ratio is not None:
+        return ratio
+    ratios = []
+    for row in log_store.recent_execution_rows(log_file, RATIO_SAMPLE_BYTES):
+        try:
+            input_bytes, output_bytes = int(row.get("InputBytes") or 0), int(row.get("OutputBytes") or 0)
+        except ValueError:
+            continue
+        if row.get("Status") == "COMPLETE" and input_bytes > 0 and output_bytes > 0:
+            ratios.append(output_bytes / input_bytes)
+    ratio = statistics.median(ratios) if ratios else DEFAULT_OUTPUT_RATIO
+    cache[f"ratio:{log_file}"] = {"at": time.time(), "ratio": ratio}
+    _store_cache(cache)
+    if debug:
+        print(f"[DEBUG] Output/input ratio {ratio:.2f} from {len(ratios)} sample(s)")
+    return ratio
+
+def estimate_footprint(input_bytes, log_file, debug=False):
+    return int(input_bytes * output_ratio(log_file, debug) * SAFETY_FACTOR)
+
+def check_admission(stil_paths, dest_dir, log_dir, local_staging_dir, shared_staging_dir, prefer_shared,
+                    history_file, debug=False):
+    # Returns (admitted, use_shared_staging, reason)
+    input_bytes = sum(os.path.getsize(path) for path in stil_paths)
+    need = estimate_footprint(input_bytes, history_file, debug)
+    if debug:
+        print(f"[DEBUG] Estimated output footprint {need / 1024 / 1024:.1f}MB for {input_bytes / 1024 / 1024:.1f}MB input")
+
+    if free_bytes(log_dir, debug) < LOG_HEADROOM_BYTES + MIN_FREE_BYTES:
+        return False, prefer_shared, f"not enough space for logs in {log_dir}"
+    if free_bytes(dest_dir, debug) < need + MIN_FREE_BYTES:
+        return False, prefer_shared, f"not enough space in {dest_dir} for ~{need / 1024 / 1024:.0f}MB"
+
+    # Shared staging sits on the destination filesystem, so publishing is a rename and
+    # the space already checked above covers it; local staging needs its own room.
+    use_shared = prefer_shared
+    if not use_shared and free_bytes(local_staging_dir, debug) < need + MIN_FREE_BYTES:
+        print(f"[INFO] Local scratch {local_staging_dir} is short on space; staging on {shared_staging_dir}.")
+        use_shared = True
+    reserve(dest_dir, need)
+    if not use_shared:
+        reserve(local_staging_dir, need)
+    return True, use_shared, ""
@@ -0,0 +1,324 @@
+import abc
+import getpass
+import json
+import math
+import os
+import random
+import shlex
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from datetime import datetime
+import lanes
+import run_state
+
+TDL_MODULE = "tdl"
+TDL_ENV_CACHE_FILE = f"/tmp/stil_tdl_env_{getpass.getuser()}.json"  # per host and user, like the disk cache
+TDL_RESOLVE_TIMEOUT = 120
+TDL_FAILURE_RETRY_SEC = 3600  # a failed resolve is retried after this long, or as soon as the modulefiles change
+VOLATILE_ENV = ("PWD", "OLDPWD", "SHLVL", "_")
+
+# repack_config.json may carry an "executor" section; "backend" (or the scheduler's --executor) picks the
+# backend for every run, otherwise the lane decides between local and slurm:
+#   {"backend": "simulated", "mean_sec": 2.0, "sigma": 0.5, "sec_per_mb": 0.0, "failure_rate": 0.02,
+#    "output_files": 2, "output_bytes": 4096, "seed": 1}
+
+_tdl_env = None
+_peak_rss_kb = {}  # job name -> peak RSS of its last run, filled by Executor.run
+
+def modulefile_stamp(modulepath):
+    # mtimes of /etc/profile, the MODULEPATH directories and every tdl modulefile on them;
+    # any edit, new tdl version or default change shows up here
+    stamp = {}
+    paths = ["/etc/profile"]
+    for root in filter(None, modulepath.split(":")):
+        paths += [root, os.path.join(root, TDL_MODULE), os.path.join(root, f"{TDL_MODULE}.lua")]
+    for path in paths:
+        try:
+            stamp[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        if path.endswith(os.sep + TDL_MODULE) and os.path.isdir(path):
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    stamp[entry.path] = entry.stat().st_mtime_ns
+    return stamp
+
+def resolve_tdl_environment():
+    result = subprocess.run(["bash", "-c", f"source /etc/profile && module load {TDL_MODULE} && env -0"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+                            timeout=TDL_RESOLVE_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(f"module load {TDL_MODULE} failed: {result.stderr.strip()}")
+    env = dict(item.split("=", 1) for item in result.stdout.split("\0") if "=" in item)
+    for key in VOLATILE_ENV:
+        env.pop(key, None)
+    return env
+
+def _load_tdl_cache():
+    try:
+        with open(TDL_ENV_CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _store_tdl_cache(cached):
+    # The environment may carry credentials: readable by the owner only
+    tmp = f"{TDL_ENV_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump(cached, f)
+        os.replace(tmp, TDL_ENV_CACHE_FILE)
+    except OSError as e:
+        print(f"[WARN] Failed to write tdl environment cache {TDL_ENV_CACHE_FILE}: {e}")
+
+def _tdl_cache_valid(cached):
+    # Entries come from a file another version may have written; anything malformed is resolved again
+    if not isinstance(cached, dict) or cached.get("host") != socket.gethostname():
+        return False
+    if cached.get("error"):
+        at = cached.get("at")
+        return (isinstance(at, (int, float)) and time.time() - at < TDL_FAILURE_RETRY_SEC
+                and cached.get("stamp") == modulefile_stamp(os.environ.get("MODULEPATH", "")))
+    env = cached.get("env")
+    return (isinstance(env, dict) and isinstance(cached.get("ategen"), str)
+            and cached.get("stamp") == modulefile_stamp(env.get("MODULEPATH", "")))
+
+def tdl_environment(debug=False):
+    # {"env": ..., "ategen": absolute path} after `module load tdl`, resolved once per host
+    # and reused until the modulefiles change. A failed resolve is remembered as well and raised
+    # again, so each task goes straight to the fallback instead of repeating the failing load.
+    global _tdl_env
+    cached = _tdl_env or _load_tdl_cache()
+    if _tdl_cache_valid(cached):
+        _tdl_env = cached
+        if cached.get("error"):
+            raise RuntimeError(f"{cached['error']} (cached since {cached.get('resolved')}; "
+                               f"retried after {TDL_FAILURE_RETRY_SEC}s or a modulefile change)")
+        return cached
+    try:
+        env = resolve_tdl_environment()
+        ategen = shutil.which("ategen", path=env.get("PATH", ""))
+        if not ategen:
+            raise RuntimeError(f"ategen is not on PATH after module load {TDL_MODULE}")
+    except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+        _tdl_env = {
+            "host": socket.gethostname(),
+            "resolved": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "at": time.time(),
+            "stamp": modulefile_stamp(os.environ.get("MODULEPATH", "")),
+            "error": str(e),
+        }
+        _store_tdl_cache(_tdl_env)
+        raise
+    cached = {
+        "host": socket.gethostname(),
+        "resolved": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "stamp": modulefile_stamp(env.get("MODULEPATH", "")),
+        "ategen": ategen,
+        "env": env,
+    }
+    _store_tdl_cache(cached)
+    _tdl_env = cached
+    print(f"[INFO] Resolved the {TDL_MODULE} environment ({len(env)} variables, ategen at {ategen})")
+    if debug:
+        print(f"[DEBUG] tdl environment cache invalidated by changes to: {', '.join(sorted(cached['stamp']))}")
+    return cached
+
+def execute(argv, debug=False, run=None, env=None):
+    # `run` = (job_name, batch_id, task_keys, slurm) records the process so stilq can cancel it;
+    # `env` None inherits the scheduler's environment
+    if debug:
+        print(f"[DEBUG] Executing command: {shlex.join(argv)}")
+
+    start_time = datetime.now()
+    start_sec = time.time()
+    # Own session so a cancel can signal the whole process group
+    proc = subprocess.Popen(
+        argv,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        start_new_session=True,
+        env=env
+    )
+    if run:
+        run_state.record_run(run[0], proc.pid, run[1], run[2], run[3], debug)
+    stdout, stderr = [], []
+    readers = [threading.Thread(target=lambda pipe, out: out.append(pipe.read()), args=(pipe, out), daemon=True)
+               for pipe, out in ((proc.stdout, stdout), (proc.stderr, stderr))]
+    try:
+        for reader in readers:
+            reader.start()
+        # wait4 instead of communicate: its rusage is this run's peak RSS (the child and what it waited for),
+        # not the largest child the scheduler ever reaped
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        for reader in readers:
+            reader.join()
+    finally:
+        if run:
+            run_state.clear_run(run[0])
+    if run:
+        _peak_rss_kb[run[0]] = usage.ru_maxrss
+    end_sec = time.time()
+    end_time = datetime.now()
+    duration = round(end_sec - start_sec, 2)
+    output = "".join(stdout) + "\n" + "".join(stderr)
+    if debug:
+        print(f"[DEBUG] Command output:\n{output}")
+        print(f"[DEBUG] Execution duration: {duration}s")
+    return proc.returncode == 0, output, start_time, end_time, duration
+
+def peak_rss_kb(job_name):
+    # Peak RSS in KB of the finished run `job_name`, or None when it could not be measured
+    return _peak_rss_kb.pop(job_name, None)
+
+def slurm_peak_rss_kb(job_name, since):
+    # MaxRSS over the steps of the job as accounted by Slurm; None when sacct has no record (yet)
+    try:
+        out = subprocess.check_output(["sacct", "-n", "-P", "--name", job_name, "-S", since.strftime("%Y-%m-%dT%H:%M:%S"),
+                                       "-o", "MaxRSS", "--units=K"], stderr=subprocess.DEVNULL, universal_newlines=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    values = []
+    for value in out.split():
+        try:
+            values.append(float(value.rstrip("K")))
+        except ValueError:
+            continue
+    return int(max(values)) if values else None
+
+def file_base(path):
+    # Same naming as ategen outputs: the file name up to its first dot
+    return os.path.basename(path.strip()).split(".")[0].rstrip("_")
+
+class Executor(abc.ABC):
+    # Runs one ategen invocation over `stil_paths`; returns (success, output, start_time, end_time, duration)
+    name = ""
+    slurm = False
+
+    def __init__(self, config):
+        self.config = config
+
+    def ategen_argv(self, stil_paths, project_name, log_path, setup_file, workdir, ategen="ategen"):
+        return [
+            ategen,
+            "-input_file_type:STIL",
+            f"-workdir:{workdir}",
+            f"-project_name:{project_name}",
+            f"-logfile:{log_path}",
+            f"-setup:{setup_file}",
+            "-licwait",
+            "-timestamp",
+            *stil_paths,
+        ]
+
+    def shell_argv(self, stil_paths, project_name, log_path, setup_file, workdir):
+        # ategen started through a shell that loads tdl itself
+        ategen_cmd = shlex.join(self.ategen_argv(stil_paths, project_name, log_path, setup_file, workdir))
+        return ["bash", "-c", f"source /etc/profile && module load {TDL_MODULE} && {ategen_cmd}"]
+
+    def ategen(self, stil_paths, project_name, log_path, setup_file, workdir, debug=False):
+        # (argv, env) starting ategen directly in the cached tdl environment; when that cannot be
+        # resolved, through a login shell as before
+        try:
+            tdl = tdl_environment(debug)
+            return self.ategen_argv(stil_paths, project_name, log_path, setup_file, workdir, tdl["ategen"]), tdl["env"]
+        except (OSError, RuntimeError, KeyError, subprocess.SubprocessError) as e:
+            print(f"[WARN] Cannot use a cached {TDL_MODULE} environment, loading it in a shell: {e}")
+            return self.shell_argv(stil_paths, project_name, log_path, setup_file, workdir), None
+
+    @abc.abstractmethod
+    def command(self, stil_paths, project_name, log_path, setup_file, workdir, job_name, debug=False):
+        # (argv, env); env None inherits the scheduler's environment
+        pass
+
+    def run(self, stil_paths, project_name, log_path, setup_file, workdir, job_name, batch_id="", task_keys=(),
+            debug=False):
+        argv, env = self.command(stil_paths, project_name, log_path, setup_file, workdir, job_name, debug)
+        return execute(argv, debug, (job_name, batch_id, task_keys, self.slurm), env)
+
+class LocalShellExecutor(Executor):
+    name = "local"
+
+    def command(self, stil_paths, project_name, log_path, setup_file, workdir, job_name, debug=False):
+        return self.ategen(stil_paths, project_name, log_path, setup_file, workdir, debug)
+
+class SlurmExecutor(Executor):
+    # The tdl environment resolved here belongs to this host; the compute node loads its own in the job
+    name = "slurm"
+    slurm = True
+
+    def command(self, stil_paths, project_name, log_path, setup_file, workdir, job_name, debug=False):
+        return ["srun", "-p", lanes.SLURM_PARTITION, f"--mem={lanes.SLURM_MEM_GB}G",
+                f"--cpus-per-task={lanes.SLURM_CPUS}", f"--job-name={job_name}",
+                *self.shell_argv(stil_paths, project_name, log_path, setup_file, workdir)], None
+
+    def run(self, stil_paths, project_name, log_path, setup_file, workdir, job_name, batch_id="", task_keys=(),
+            debug=False):
+        result = super().run(stil_paths, project_name, log_path, setup_file, workdir, job_name, batch_id, task_keys,
+                             debug)
+        # The local child is only the srun client; the job's memory comes from accounting
+        _peak_rss_kb[job_name] = slurm_peak_rss_kb(job_name, result[2])
+        return result
+
+class SimulatedExecutor(Executor):
+    # Stand-in for ategen: a `sleep` child (so cancel and run tracking behave as for real runs),
+    # then output files for every input that did not draw a failure
+    name = "simulated"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.settings = config.get("executor", {})
+        self.random = random.Random()
+
+    def duration(self, stil_paths):
+        mean = float(self.settings.get("mean_sec", 2.0))
+        sigma = float(self.settings.get("sigma", 0.5))
+        seconds = self.random.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma) if mean > 0 else 0.0
+        per_mb = float(self.settings.get("sec_per_mb", 0.0))
+        if per_mb:
+            seconds += per_mb * sum(os.path.getsize(path) for path in stil_paths) / 1024 / 1024
+        return seconds
+
+    def command(self, stil_paths, project_name, log_path, setup_file, workdir, job_name, debug=False):
+        return ["sleep", f"{self.duration(stil_paths):.3f}"], None
+
+    def run(self, stil_paths, project_name, log_path, setup_file, workdir, job_name, batch_id="", task_keys=(),
+            debug=False):
+        if self.settings.get("seed") is not None:
+            # Reproducible per run, whatever order the runs happen in
+            self.random.seed(f"{self.settings['seed']}:{job_name}")
+        failure_rate = float(self.settings.get("failure_rate", 0.0))
+        failed = {path for path in stil_paths if self.random.random() < failure_rate}
+        success, output, start_time, end_time, duration = super().run(
+            stil_paths, project_name, log_path, setup_file, workdir, job_name, batch_id, task_keys, debug)
+        if not success:
+            return success, output + "\nERROR: simulated ategen was interrupted", start_time, end_time, duration
+        lines = []
+        project_dir = os.path.join(workdir, project_name)
+        os.makedirs(project_dir, exist_ok=True)
+        for path in stil_paths:
+            base = file_base(path)
+            if path in failed:
+                lines.append(f"ERROR: simulated conversion failure in {base}")
+                continue
+            for i in range(int(self.settings.get("output_files", 2))):
+                with open(os.path.join(project_dir, f"{base}_{i}.pat"), "wb") as f:
+                    f.write(b"\0" * int(self.settings.get("output_bytes", 4096)))
+            lines.append(f"INFO: simulated conversion of {base} done")
+        with open(log_path, "a") as log:
+            log.write("\n".join(lines) + "\n")
+        return not failed, output + "\n".join(lines), start_time, end_time, duration
+
+EXECUTORS = {executor.name: executor for executor in (LocalShellExecutor, SlurmExecutor, SimulatedExecutor)}
+
+def executor_for(slurm, config, backend=None):
+    backend = backend or config.get("executor", {}).get("backend", "")
+    if backend and backend not in EXECUTORS:
+        print(f"[WARN] Unknown executor '{backend}'; using the {'slurm' if slurm else 'local'} executor")
+        backend = ""
+    return EXECUTORS[backend or ("slurm" if slurm else "local")](config)
@@ -0,0 +1,78 @@
+import getpass
+import os
+import subprocess
+from collections import Counter
+
+SIZE_THRESHOLD = 20 * 1024 * 1024  # inputs at or above this go to Slurm by default
+SLURM_PARTITION = "hw-h"
+SLURM_MEM_GB = 32
+SLURM_CPUS = 2
+LANES = ("local", "slurm")
+LANE_SLOTS = {"local": 1, "slurm": 4}  # concurrent runs per lane, within the ategen license limit (MAX_LICENSE)
+LANE_COLUMN = 13
+
+def home_lane(size_bytes):
+    return "slurm" if size_bytes >= SIZE_THRESHOLD else "local"
+
+def task_lane(row):
+    # Home lane of a queued task, by input size; unreadable inputs stay local so they fail fast
+    try:
+        return home_lane(os.path.getsize(row[4]))
+    except OSError:
+        return "local"
+
+def running_lane(row):
+    return row[LANE_COLUMN] if len(row) > LANE_COLUMN else ""
+
+def lane_load(tasks):
+    # Concurrent runs per lane; the rows of one batch run share its worker and fence.
+    # Rows without a fence (written before leases existed) count as a run each.
+    runs = {(running_lane(row), row[10], row[12]) if len(row) > 12 and row[12] else (running_lane(row), id(row))
+            for row in tasks if len(row) >= 7 and row[6] == "RUNNING"}
+    return Counter(run[0] for run in runs)
+
+def available_memory():
+    # MemAvailable in bytes, or None where /proc/meminfo is missing
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def slurm_backlog(debug=False):
+    # Our ategen jobs still waiting for resources in the partition
+    try:
+        jobs = subprocess.check_output(["squeue", "-u", getpass.getuser(), "-h", "-t", "PENDING",
+                                        "-p", SLURM_PARTITION, "-o", "%j"], universal_newlines=True).splitlines()
+    except (OSError, subprocess.CalledProcessError) as e:
+        if debug:
+            print(f"[DEBUG] squeue failed, assuming no Slurm backlog: {e}")
+        return 0
+    return sum(1 for job in jobs if "ategen" in job)
+
+def steal_reason(lane, load, debug=False, backlog=None):
+    # Why `lane` may take work homed on the other lane right now, or None.
+    # Slurm tasks are sized for a SLURM_MEM_GB allocation, so they only run locally when that much is free.
+    # `backlog` is slurm_backlog() when the caller already queried it.
+    if lane == "slurm":
+        if load["local"] >= LANE_SLOTS["local"]:
+            return f"local lane busy ({load['local']}/{LANE_SLOTS['local']})"
+        return None
+    if load["slurm"] < LANE_SLOTS["slurm"]:
+        if backlog is None:
+            backlog = slurm_backlog(debug)
+        if not backlog:
+            return None
+        congestion = f"{backlog} job(s) waiting in {SLURM_PARTITION}"
+    else:
+        congestion = f"slurm lane busy ({load['slurm']}/{LANE_SLOTS['slurm']})"
+    free = available_memory()
+    if free is None or free < SLURM_MEM_GB * 1024 ** 3:
+        if debug:
+            print(f"[DEBUG] Not stealing Slurm work ({congestion}): "
+                  f"{'unknown' if free is None else f'{free / 1024 ** 3:.1f}GB'} available, {SLURM_MEM_GB}GB needed")
+        return None
+    return congestion
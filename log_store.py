@@ -0,0 +1,249 @@
+import csv
+import fcntl
+import glob
+import gzip
+import io
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from config import BASE_DIR, EXECUTION_LOG_FILE
+
+LOG_DIR = os.path.join(BASE_DIR, "logs")
+LOG_INDEX_NAME = "index.csv"
+LOG_INDEX_HEADER = ["BatchID", "STIL_Path", "LogFile", "Created"]
+EXEC_LOG_MAX_BYTES = 50 * 1024 * 1024
+EXEC_LOG_TAIL_BYTES = 2 * 1024 * 1024
+LOG_RETENTION_DAYS = 180
+
+def index_file(log_dir=None):
+    return os.path.join(log_dir or LOG_DIR, LOG_INDEX_NAME)
+
+def new_log_path(batch_id, log_dir=None):
+    # One file per task even when several tasks of a batch start within the same second
+    log_dir = log_dir or LOG_DIR
+    stem = os.path.join(log_dir, f"{batch_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    path, n = f"{stem}.log", 1
+    while os.path.exists(path) or os.path.exists(path + ".gz"):
+        path = f"{stem}_{n}.log"
+        n += 1
+    return path
+
+def compress_log(path, debug=False):
+    gz_path = path + ".gz"
+    tmp = f"{gz_path}.{os.getpid()}.tmp"
+    with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, gz_path)
+    os.remove(path)
+    if debug:
+        print(f"[DEBUG] Compressed {path} -> {gz_path}")
+    return gz_path
+
+def index_log(batch_id, stil_paths, log_path, log_dir=None):
+    path = index_file(log_dir)
+    with open(path, "a", newline='') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        writer = csv.writer(f)
+        if f.tell() == 0:
+            writer.writerow(LOG_INDEX_HEADER)
+        created = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for stil_path in stil_paths:
+            writer.writerow([batch_id, stil_path, os.path.basename(log_path), created])
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+def finalize_task_log(batch_id, stil_paths, log_path, debug=False):
+    # Called once the scheduler has appended the captured output; the task log is immutable after this
+    log_dir = os.path.dirname(log_path)
+    try:
+        log_path = compress_log(log_path, debug)
+    except OSError as e:
+        print(f"[WARN] Failed to compress {log_path}: {e}")
+    index_log(batch_id, stil_paths, log_path, log_dir)
+    return log_path
+
+def find_logs(batch_id, stil_path=None, log_dir=None):
+    # Matches on batch and, optionally, the full STIL path or any substring of its file name
+    log_dir = log_dir or LOG_DIR
+    found = []
+    if os.path.exists(index_file(log_dir)):
+        with open(index_file(log_dir), newline='') as f:
+            for row in csv.DictReader(f):
+                if row["BatchID"] != batch_id:
+                    continue
+                if stil_path and stil_path != row["STIL_Path"] and stil_path not in os.path.basename(row["STIL_Path"]):
+                    continue
+                path = os.path.join(log_dir, row["LogFile"])
+                if path not in found:
+                    found.append(path)
+    if not found and not stil_path:
+        # Logs written before the index existed
+        found = sorted(glob.glob(os.path.join(log_dir, f"{glob.escape(batch_id)}_*.log*")))
+    return [path for path in found if os.path.exists(path)]
+
+def open_log(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", errors="replace")
+    return open(path, errors="replace")
+
+def stream_log(path, out=None, tail=None):
+    out = out or sys.stdout
+    with open_log(path) as f:
+        if tail:
+            for line in deque(f, maxlen=tail):
+                out.write(line)
+        else:
+            shutil.copyfileobj(f, out)
+
+def _first_row_month(path):
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        row = next(reader, None)
+    return row[0][:7] if row else None
+
+def lock_execution_log(path=None):
+    # Held around rotate, header upgrade and append; closing the returned file releases it
+    lock = open(f"{path or EXECUTION_LOG_FILE}.lock", "a")
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    return lock
+
+def tail_log_path(path=None):
+    # Last rows of the newest rotated log, kept uncompressed so recent history survives rotation
+    stem, ext = os.path.splitext(path or EXECUTION_LOG_FILE)
+    return f"{stem}.tail{ext}"
+
+def _tail_text(path, max_bytes):
+    with open(path, "rb") as f:
+        header = f.readline().decode(errors="replace")
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        start = max(len(header), size - max_bytes)
+        f.seek(start)
+        chunk = f.read().decode(errors="replace")
+    if start > len(header):
+        chunk = chunk.split("\n", 1)[-1]  # drop the partial first line
+    return header + chunk
+
+def tail_rows(path, max_bytes):
+    return csv.DictReader(io.StringIO(_tail_text(path, max_bytes)))
+
+def recent_execution_rows(path=None, max_bytes=None):
+    # Rows from about the last `max_bytes` of history, oldest first, topped up from the rotated tail
+    path = path or EXECUTION_LOG_FILE
+    max_bytes = max_bytes or EXEC_LOG_TAIL_BYTES
+    rows, size = [], 0
+    if os.path.exists(path):
+        size = os.path.getsize(path)
+        rows = list(tail_rows(path, max_bytes))
+    tail = tail_log_path(path)
+    if size < max_bytes and os.path.exists(tail):
+        rows = list(tail_rows(tail, max_bytes - size)) + rows
+    return rows
+
+def rotate_execution_log(path=None, max_bytes=None, debug=False):
+    # Rotate when the log is too big or its first entry is from an earlier month;
+    # callers hold lock_execution_log
+    path = path or EXECUTION_LOG_FILE
+    max_bytes = max_bytes or EXEC_LOG_MAX_BYTES
+    if not os.path.exists(path):
+        return None
+    size = os.path.getsize(path)
+    month = _first_row_month(path)
+    if size < max_bytes and (month is None or month == datetime.now().strftime("%Y-%m")):
+        return None
+    stem, ext = os.path.splitext(path)
+    rotated = f"{stem}.{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
+    os.replace(path, rotated)
+    _keep_tail(rotated, tail_log_path(path))
+    rotated = compress_log(rotated)
+    print(f"[INFO] Rotated {path} ({size / 1024 / 1024:.1f}MB) -> {rotated}")
+    return rotated
+
+def _keep_tail(path, tail):
+    text = _tail_text(path, EXEC_LOG_TAIL_BYTES)
+    with open(tail + ".tmp", "w", newline='') as f:
+        f.write(text)
+    os.replace(tail + ".tmp", tail)
+
+def rotated_execution_logs(path=None):
+    path = path or EXECUTION_LOG_FILE
+    stem, ext = os.path.splitext(path)
+    return sorted(glob.glob(f"{glob.escape(stem)}.*{ext}.gz"))
+
+def iter_execution_log(path=None, rotated=None):
+    # Rows oldest first; `rotated` limits how many of the newest rotated files are included
+    path = path or EXECUTION_LOG_FILE
+    files = rotated_execution_logs(path)
+    if rotated is not None:
+        files = files[len(files) - rotated:] if rotated else []
+    if os.path.exists(path):
+        files.append(path)
+    for file in files:
+        with open_log(file) as f:
+            yield from csv.DictReader(f)
+
+def compress_stale_logs(log_dir=None, min_age_sec=24 * 3600, debug=False):
+    # Sweep for task logs left uncompressed, e.g. by an interrupted scheduler run
+    count = 0
+    for path in glob.glob(os.path.join(log_dir or LOG_DIR, "*.log")):
+        if time.time() - os.path.getmtime(path) >= min_age_sec:
+            compress_log(path, debug)
+            count += 1
+    print(f"[INFO] Compressed {count} stale log(s).")
+    return count
+
+def prune_logs(log_dir=None, days=None, debug=False):
+    log_dir = log_dir or LOG_DIR
+    cutoff = time.time() - (days or LOG_RETENTION_DAYS) * 86400
+    removed = set()
+    for path in glob.glob(os.path.join(log_dir, "*.log.gz")):
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed.add(os.path.basename(path))
+            if debug:
+                print(f"[DEBUG] Removed {path}")
+    if removed and os.path.exists(index_file(log_dir)):
+        with open(index_file(log_dir), "r+", newline='') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            rows = [row for row in csv.reader(f) if len(row) < 3 or row[2] not in removed]
+            f.seek(0)
+            csv.writer(f).writerows(rows)
+            f.truncate()
+            fcntl.flock(f, fcntl.LOCK_UN)
+    print(f"[INFO] Pruned {len(removed)} log(s) older than {days or LOG_RETENTION_DAYS} day(s).")
+    return len(removed)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Find, stream and maintain scheduler logs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="Stream the log(s) of a batch or one of its tasks")
+    show.add_argument("batch_id")
+    show.add_argument("task", nargs="?", help="STIL path or part of its file name")
+    show.add_argument("--tail", type=int, help="Only print the last N lines")
+    sub.add_parser("rotate", help="Rotate execution_log.csv if it is too big or from an earlier month")
+    sub.add_parser("compress", help="Compress task logs left uncompressed")
+    prune = sub.add_parser("prune", help="Delete compressed task logs past retention")
+    prune.add_argument("--days", type=int, default=LOG_RETENTION_DAYS)
+    parser.add_argument("--debug", action="store_true", help="Enable debug logs")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        logs = find_logs(args.batch_id, args.task)
+        if not logs:
+            print(f"[ERROR] No logs found for {args.batch_id} {args.task or ''}".rstrip())
+            sys.exit(1)
+        for path in logs:
+            if len(logs) > 1:
+                print(f"==> {path} <==")
+            stream_log(path, tail=args.tail)
+    elif args.command == "rotate":
+        with lock_execution_log():
+            rotate_execution_log(debug=args.debug)
+    elif args.command == "compress":
+        compress_stale_logs(debug=args.debug)
+    else:
+        prune_logs(days=args.days, debug=args.debug)
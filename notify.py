@@ -0,0 +1,304 @@
+import abc
+import fcntl
+import glob
+import json
+import os
+import smtplib
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from email.mime.text import MIMEText
+from config import BASE_DIR, load_config
+
+OUTBOX_DIR = os.path.join(BASE_DIR, "outbox")
+NOTIFICATION_DROP_DIR = os.path.join(BASE_DIR, "notifications")
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 60  # seconds, doubled per failed attempt
+BACKOFF_MAX = 3600
+DEFAULT_PREFERENCES = {"sinks": ["smtp"], "early_failure": False}
+
+# repack_config.json may carry a "notify" section:
+#   {"default": {"sinks": ["smtp"], "early_failure": false},
+#    "users": {"kimhuang": {"sinks": ["smtp", "webhook"], "early_failure": true}},
+#    "webhook_url": "http://localhost:8080/stil", "drop_dir": "/path/to/notifications"}
+
+class Sink(abc.ABC):
+    # Delivery channel for queued notifications; one instance serves a whole outbox drain
+    name = ""
+    coalesce = False
+
+    def __init__(self, config):
+        self.config = config
+
+    def open(self):
+        pass
+
+    @abc.abstractmethod
+    def send(self, message):
+        pass
+
+    def close(self):
+        pass
+
+class SmtpSink(Sink):
+    name = "smtp"
+    coalesce = True
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.email_config = config.get("email", {})
+        self.server = None
+
+    def _connect(self):
+        host = self.email_config.get("smtp_host", SMTP_HOST)
+        port = int(self.email_config.get("smtp_port", SMTP_PORT))
+        self.server = smtplib.SMTP(host, port, timeout=60)
+        if self.email_config.get("starttls", True):
+            self.server.starttls()
+        if self.email_config.get("password"):
+            self.server.login(self.email_config["from"], self.email_config["password"])
+
+    def open(self):
+        self._connect()
+
+    def send(self, message):
+        msg = MIMEText(message["body"])
+        msg["From"] = self.email_config["from"]
+        msg["To"] = message["to"]
+        msg["Subject"] = message["subject"]
+        try:
+            self.server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # One reconnect; further failures fall back to retry with backoff
+            self._connect()
+            self.server.send_message(msg)
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except smtplib.SMTPException:
+                pass
+            self.server = None
+
+class FileSink(Sink):
+    name = "file"
+
+    def send(self, message):
+        drop_dir = os.path.join(self.config.get("notify", {}).get("drop_dir", NOTIFICATION_DROP_DIR), message["user"] or "unknown")
+        os.makedirs(drop_dir, exist_ok=True)
+        path = os.path.join(drop_dir, f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(message, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+class WebhookSink(Sink):
+    name = "webhook"
+
+    def send(self, message):
+        url = self.config.get("notify", {}).get("webhook_url")
+        if not url:
+            raise ValueError("notify.webhook_url is not configured")
+        data = json.dumps({key: message[key] for key in ("user", "to", "subject", "body", "event")}).encode()
+        request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+
+class StdoutSink(Sink):
+    name = "stdout"
+
+    def send(self, message):
+        print(f"[NOTIFY] {message['user']} <{message['to']}>: {message['subject']}\n{message['body']}")
+
+SINKS = {sink.name: sink for sink in (SmtpSink, FileSink, WebhookSink, StdoutSink)}
+
+def user_preferences(user, config):
+    notify_config = config.get("notify", {})
+    preferences = dict(DEFAULT_PREFERENCES)
+    preferences.update(notify_config.get("default", {}))
+    preferences.update(notify_config.get("users", {}).get(user, {}))
+    return preferences
+
+def dead_dir():
+    return os.path.join(OUTBOX_DIR, "dead")
+
+def _write_message(path, message):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(message, f, indent=1)
+    os.replace(tmp, path)
+
+def queue_notification(user, to_email, subject, body, event, config=None, debug=False):
+    # Persist one message per sink the user subscribed to; delivery happens in the background sender.
+    # `event` is a dict with at least "type" (batch_complete, first_failure) and "batch_id".
+    config = load_config() if config is None else config
+    preferences = user_preferences(user, config)
+    if event["type"] == "first_failure" and not preferences.get("early_failure"):
+        return []
+    os.makedirs(OUTBOX_DIR, exist_ok=True)
+    paths = []
+    for sink in preferences["sinks"]:
+        if sink not in SINKS:
+            print(f"[WARN] Unknown notification sink '{sink}' for {user}; skipping")
+            continue
+        message = {
+            "sink": sink,
+            "user": user,
+            "to": to_email,
+            "subject": subject,
+            "body": body,
+            "event": event,
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "attempts": 0,
+            "next_attempt": 0,
+            "last_error": "",
+        }
+        # Microsecond names keep the outbox (and delivery) in queueing order
+        path = os.path.join(OUTBOX_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}.json")
+        _write_message(path, message)
+        paths.append(path)
+        if debug:
+            print(f"[DEBUG] Queued {sink} notification for {user}: {subject} ({path})")
+    return paths
+
+def pending_messages(now=None):
+    now = now or time.time()
+    due = []
+    for path in sorted(glob.glob(os.path.join(OUTBOX_DIR, "*.json"))):
+        try:
+            with open(path) as f:
+                message = json.load(f)
+        except (OSError, ValueError):
+            continue
+        message.setdefault("sink", "smtp")  # queued before sinks existed
+        message.setdefault("user", "")
+        message.setdefault("event", {})
+        if message.get("next_attempt", 0) <= now:
+            due.append((path, message))
+    return due
+
+def coalesce(messages):
+    # One message per recipient; several notifications become a digest
+    by_recipient = defaultdict(list)
+    for path, message in messages:
+        by_recipient[message["to"]].append((path, message))
+    for items in by_recipient.values():
+        if len(items) == 1:
+            path, message = items[0]
+            yield message, [path]
+            continue
+        first = items[0][1]
+        parts = [f"{message['subject']}\n{'-' * len(message['subject'])}\n{message['body']}" for _, message in items]
+        digest = {
+            **first,
+            "subject": f"[DIGEST] {len(items)} Pattern Release notifications",
+            "body": "\n\n\n".join(parts),
+            "event": {"type": "digest", "events": [message["event"] for _, message in items]},
+        }
+        yield digest, [path for path, _ in items]
+
+def _record_failure(paths, error, debug=False):
+    for path in paths:
+        try:
+            with open(path) as f:
+                message = json.load(f)
+        except (OSError, ValueError):
+            continue
+        message["attempts"] += 1
+        message["last_error"] = str(error)
+        if message["attempts"] >= MAX_ATTEMPTS:
+            os.makedirs(dead_dir(), exist_ok=True)
+            os.replace(path, os.path.join(dead_dir(), os.path.basename(path)))
+            print(f"[ERROR] Giving up on {message.get('sink', 'smtp')} notification to {message['to']} "
+                  f"after {message['attempts']} attempts: {error}")
+            continue
+        delay = min(BACKOFF_BASE * 2 ** (message["attempts"] - 1), BACKOFF_MAX)
+        message["next_attempt"] = time.time() + delay
+        _write_message(path, message)
+        if debug:
+            print(f"[DEBUG] Notification to {message['to']} failed ({error}); retry in {delay}s")
+
+def deliver_sink(sink, messages, debug=False):
+    try:
+        sink.open()
+    except Exception as e:
+        print(f"[WARN] {sink.name} sink unavailable: {e}")
+        _record_failure([path for path, _ in messages], e, debug)
+        return 0
+    sent = 0
+    try:
+        batches = coalesce(messages) if sink.coalesce else ((message, [path]) for path, message in messages)
+        for message, paths in batches:
+            try:
+                sink.send(message)
+            except Exception as e:
+                _record_failure(paths, e, debug)
+                continue
+            for path in paths:
+                os.remove(path)
+            sent += 1
+            if debug:
+                print(f"[DEBUG] {sink.name}: sent '{message['subject']}' to {message['to']} ({len(paths)} notification(s))")
+    finally:
+        sink.close()
+    return sent
+
+def deliver_outbox(config, debug=False):
+    # Single sender at a time; it keeps draining while new notifications keep arriving
+    os.makedirs(OUTBOX_DIR, exist_ok=True)
+    with open(os.path.join(OUTBOX_DIR, ".sender.lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if debug:
+                print("[DEBUG] Another sender is draining the outbox.")
+            return 0
+        sent = 0
+        while True:
+            messages = pending_messages()
+            if not messages:
+                break
+            by_sink = defaultdict(list)
+            for path, message in messages:
+                by_sink[message["sink"]].append((path, message))
+            for name, items in by_sink.items():
+                if name not in SINKS:
+                    _record_failure([path for path, _ in items], f"unknown sink {name}", debug)
+                    continue
+                sent += deliver_sink(SINKS[name](config), items, debug)
+        return sent
+
+def start_sender(debug=False):
+    # Detached so delivery latency never sits on the scheduler's critical path
+    if not os.path.isdir(OUTBOX_DIR) or not pending_messages():
+        return None
+    cmd = [sys.executable, os.path.abspath(__file__), "deliver"] + (["--debug"] if debug else [])
+    with open(os.path.join(OUTBOX_DIR, "sender.log"), "a") as log:
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                                start_new_session=True)
+    if debug:
+        print(f"[DEBUG] Started outbox sender pid {proc.pid}")
+    return proc
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Deliver queued scheduler notifications")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("deliver", help="Drain the outbox, one connection per sink")
+    sub.add_parser("status", help="Show queued and dead notifications")
+    parser.add_argument("--debug", action="store_true", help="Enable debug logs")
+    args = parser.parse_args()
+
+    if args.command == "deliver":
+        sent = deliver_outbox(load_config(), args.debug)
+        print(f"[INFO] {datetime.now()} sent {sent} notification(s).")
+    else:
+        queued = glob.glob(os.path.join(OUTBOX_DIR, "*.json"))
+        dead = glob.glob(os.path.join(dead_dir(), "*.json"))
+        print(f"[INFO] {len(queued)} queued, {len(pending_messages())} due now, {len(dead)} dead")
@@ -0,0 +1,112 @@
+import os
+import re
+import sys
+import log_store
+from config import EXECUTION_LOG_FILE
+
+# Budgets used to flag patterns before they reach the tester; adjust per tester model
+VECTOR_MEMORY_LIMIT = 256 * 1024 * 1024  # vectors
+PATTERN_BYTES_LIMIT = 2 * 1024 * 1024 * 1024
+PATTERN_SUFFIXES = (".binl", ".binl.gz", ".pat", ".pat.gz")
+
+# Lines of the smt8_vector_memory_summary output, e.g. "Vector memory usage: 1,234,567" or
+# "Vector memory usage of <pattern>: 1,234,567". The count is the first number after the last ':' or '=';
+# anything before may name the pattern, whose digits are not the count.
+VECTOR_MEMORY_RE = re.compile(r"(?i)vector\s*(?:memory|usage)")
+VECTOR_COUNT_RE = re.compile(r"\d[\d,]*")
+
+def named_bases(text, bases):
+    # Bases named in `text` as whole tokens: pat_a_1 is not named by pat_a_10 or pat_a_1x. Longer bases
+    # are matched first and masked, so pat_a does not also claim the pat_a_1 in "pat_a_1_0.pat".
+    named = set()
+    for base in sorted(bases, key=len, reverse=True):
+        text, count = re.subn(rf"(?<![A-Za-z0-9]){re.escape(base)}(?![A-Za-z0-9])", lambda m: "\0" * len(m.group()),
+                              text)
+        if count:
+            named.add(base)
+    return named
+
+def vector_memory_by_pattern(text, bases):
+    # The summary is printed per binary pattern; attribute each line to the pattern it names.
+    # Lines naming no known pattern are kept under "" (single-pattern runs use that total).
+    usage = {}
+    for line in text.splitlines():
+        if not VECTOR_MEMORY_RE.search(line):
+            continue
+        named = named_bases(line, bases)
+        owner = max(named, key=len) if named else ""
+        value = re.split(r"[:=]", line)[-1]
+        if owner:
+            value = value.replace(owner, "")
+        count = VECTOR_COUNT_RE.search(value)
+        if not count:
+            continue
+        usage[owner] = usage.get(owner, 0) + int(count.group().replace(",", ""))
+    return usage
+
+def is_pattern_file(rel_path):
+    return rel_path.endswith(PATTERN_SUFFIXES)
+
+def manifest_accounting(manifest, bases):
+    # Total output bytes for the run and binary pattern bytes per input base name
+    total = sum(entry["size"] for entry in manifest["files"].values())
+    ordered = sorted(bases, key=len, reverse=True)
+    pattern_bytes = {base: 0 for base in bases}
+    for rel, entry in manifest["files"].items():
+        if not is_pattern_file(rel):
+            continue
+        owner = next((base for base in ordered if base in os.path.basename(rel)), None)
+        if owner is not None:
+            pattern_bytes[owner] += entry["size"]
+    return total, pattern_bytes
+
+def latest_batch_rows(batch_id, log_file=None):
+    # Last logged attempt per (pattern, overrides); earlier retries are superseded.
+    # A batch can straddle one rotation, so the newest rotated log is read as well.
+    rows = {}
+    for row in log_store.iter_execution_log(log_file or EXECUTION_LOG_FILE, rotated=1):
+        if row.get("BatchID") == batch_id:
+            rows[(row["STIL_Path"], row.get("Overrides") or "")] = row
+    return list(rows.values())
+
+def _as_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def batch_report(batch_id, log_file=None, vector_limit=None, bytes_limit=None):
+    vector_limit = vector_limit or VECTOR_MEMORY_LIMIT
+    bytes_limit = bytes_limit or PATTERN_BYTES_LIMIT
+    lines = []
+    flagged = 0
+    total_pattern_bytes = 0
+    for row in sorted(latest_batch_rows(batch_id, log_file), key=lambda r: r["STIL_Path"]):
+        vectors = _as_int(row.get("VectorMemory"))
+        pattern_bytes = _as_int(row.get("PatternBytes"))
+        total_pattern_bytes += pattern_bytes or 0
+        warnings = []
+        if vectors is not None and vectors > vector_limit:
+            warnings.append(f"vector memory over budget ({vectors} > {vector_limit})")
+        if pattern_bytes is not None and pattern_bytes > bytes_limit:
+            warnings.append(f"pattern size over budget ({pattern_bytes / 1024 / 1024:.1f}MB)")
+        flagged += bool(warnings)
+        size = f"{pattern_bytes / 1024 / 1024:.2f}MB" if pattern_bytes is not None else "n/a"
+        lines.append(f"{'!!' if warnings else '  '} {os.path.basename(row['STIL_Path'])}  {row['Status']}  "
+                     f"pattern={size}  vectors={vectors if vectors is not None else 'n/a'}"
+                     + (f"  <- {'; '.join(warnings)}" if warnings else ""))
+    lines.append(f"Total pattern size {total_pattern_bytes / 1024 / 1024:.2f}MB, {flagged} pattern(s) over budget")
+    return lines, flagged
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Report output size and vector memory per batch")
+    parser.add_argument("batch_id")
+    parser.add_argument("--log", help="Execution log to read", default=None)
+    parser.add_argument("--vector-limit", type=int, help=f"Vector budget (default {VECTOR_MEMORY_LIMIT})")
+    parser.add_argument("--bytes-limit", type=int, help=f"Pattern size budget (default {PATTERN_BYTES_LIMIT})")
+    args = parser.parse_args()
+
+    report, flagged = batch_report(args.batch_id, args.log, args.vector_limit, args.bytes_limit)
+    print("\n".join(report))
+    sys.exit(1 if flagged else 0)
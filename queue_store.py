@@ -0,0 +1,319 @@
+import csv
+import fcntl
+import hashlib
+import heapq
+import json
+import os
+import time
+from datetime import datetime
+from config import BASE_DIR
+
+QUEUE_FILE = os.path.join(BASE_DIR, "task_queue.csv")
+QUEUE_HEADER = ["Timestamp", "SubmittedBy", "Email", "BatchID", "STIL_Path", "XMode", "Status", "Overrides", "Priority",
+                "Deadline", "Worker", "LeaseExpiry", "Fence", "Lane"]
+FINAL_STATUSES = ("COMPLETE", "FAILED", "CANCELLED")
+COMPLETED_INPUTS_HEADER = ["STIL_Path", "XMode", "Size", "MTime", "BatchID"]
+PRIORITY_CLASSES = {"low": -1, "normal": 0, "high": 1, "urgent": 2}
+AGING_SEC = 3600  # waiting this long is worth one priority level, so nothing starves
+
+def encode_overrides(overrides):
+    return json.dumps(overrides, sort_keys=True, separators=(",", ":")) if overrides else ""
+
+def task_overrides(row):
+    # Rows written before the Overrides column existed have only 7 fields
+    if len(row) > 7 and row[7]:
+        return json.loads(row[7])
+    return {}
+
+def task_key(row):
+    # Stable identity of a task (a tuning batch has one row per path and setup variant)
+    overrides = row[7] if len(row) > 7 else ""
+    return hashlib.sha1(f"{row[3]}|{row[4]}|{overrides}".encode()).hexdigest()[:12]
+
+def task_priority(row):
+    # Higher runs first; rows written before the Priority column existed are 0
+    try:
+        return int(row[8]) if len(row) > 8 and row[8] else 0
+    except ValueError:
+        return 0
+
+def parse_priority(text):
+    # A class name or a plain integer
+    text = str(text).strip().lower()
+    if text in PRIORITY_CLASSES:
+        return PRIORITY_CLASSES[text]
+    try:
+        return int(text)
+    except ValueError:
+        raise ValueError(f"Invalid priority '{text}': use one of {list(PRIORITY_CLASSES)} or an integer")
+
+def submitted_at(row):
+    try:
+        return datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S").timestamp()
+    except ValueError:
+        return time.time()
+
+def effective_priority(row, now=None):
+    # Aging also yields queue order among equal classes: older work has waited longer
+    return task_priority(row) + ((now or time.time()) - submitted_at(row)) / AGING_SEC
+
+def pending_heap(tasks, now=None):
+    now = now or time.time()
+    heap = [(-effective_priority(row, now), idx, row) for idx, row in enumerate(tasks)
+            if len(row) >= 7 and row[6] == "PENDING"]
+    heapq.heapify(heap)
+    return heap
+
+def next_pending(tasks, eligible=None, now=None):
+    # Best effective priority whose `eligible(row)` holds (quotas); ties keep queue order
+    heap = pending_heap(tasks, now)
+    while heap:
+        row = heapq.heappop(heap)[2]
+        if eligible is None or eligible(row):
+            return row
+    return None
+
+def pad_row(row):
+    while len(row) < len(QUEUE_HEADER):
+        row.append("")
+    return row
+
+def lease_of(row):
+    # (worker, lease expiry epoch or None, fencing token); unleased rows give ("", None, 0)
+    worker = row[10] if len(row) > 10 else ""
+    try:
+        expiry = float(row[11]) if len(row) > 11 and row[11] else None
+    except ValueError:
+        expiry = None
+    try:
+        fence = int(row[12]) if len(row) > 12 and row[12] else 0
+    except ValueError:
+        fence = 0
+    return worker, expiry, fence
+
+def next_fence(tasks):
+    # Fencing tokens stay on finished rows, so the maximum only ever grows
+    return max((lease_of(row)[2] for row in tasks), default=0) + 1
+
+def grant_lease(row, worker, fence, lease_sec):
+    pad_row(row)
+    row[10], row[11], row[12] = worker, f"{time.time() + lease_sec:.0f}", str(fence)
+
+def release_lease(row):
+    if len(row) > 11:
+        row[10] = row[11] = ""
+
+def holds_lease(row, worker, fence):
+    held_by, _, held_fence = lease_of(row)
+    return held_by == worker and held_fence == fence
+
+def reclaim_expired(tasks, counters, now=None):
+    # RUNNING tasks whose worker stopped renewing go back to PENDING
+    now = now or time.time()
+    reclaimed = []
+    for row in tasks:
+        if len(row) < 7 or row[6] != "RUNNING":
+            continue
+        worker, expiry, _ = lease_of(row)
+        if expiry is not None and expiry < now:
+            row[6] = "PENDING"
+            release_lease(row)
+            count_transition(counters, row[3], "RUNNING", "PENDING")
+            reclaimed.append((row, worker))
+    return reclaimed
+
+def renew_leases(worker, fence, lease_sec, queue_file=None):
+    # Heartbeat; returns how many leases were still held (0 means they were lost)
+    queue_file = queue_file or QUEUE_FILE
+    with open(queue_file, "r+", newline='') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        reader = list(csv.reader(f))
+        header, tasks = reader[0], reader[1:]
+        held = [row for row in tasks if len(row) >= 7 and row[6] == "RUNNING" and holds_lease(row, worker, fence)]
+        if held:
+            counters = load_counters(f, tasks, queue_file)
+            for row in held:
+                grant_lease(row, worker, fence, lease_sec)
+            write_queue(f, header, tasks, counters, queue_file)
+        fcntl.flock(f, fcntl.LOCK_UN)
+    return len(held)
+
+def counters_file(queue_file=None):
+    return os.path.splitext(queue_file or QUEUE_FILE)[0] + ".counters.json"
+
+def count_tasks(tasks):
+    # Per batch: total plus one counter per status, e.g. {"total": 3, "pending": 1, "complete": 2}
+    batches = {}
+    for row in tasks:
+        if len(row) >= 7:
+            count_transition(batches, row[3], None, row[6])
+    return batches
+
+def count_transition(batches, batch_id, old_status, new_status, n=1):
+    counts = batches.setdefault(batch_id, {"total": 0})
+    if old_status is None:
+        counts["total"] += n
+    else:
+        counts[old_status.lower()] = counts.get(old_status.lower(), 0) - n
+    counts[new_status.lower()] = counts.get(new_status.lower(), 0) + n
+
+def batch_finished(counts):
+    return sum(counts.get(status.lower(), 0) for status in FINAL_STATUSES) == counts["total"]
+
+def _queue_stamp(st):
+    return {"queue_size": st.st_size, "queue_mtime_ns": st.st_mtime_ns}
+
+def cached_counters(f, queue_file=None):
+    # The sidecar is trusted only while it matches the queue's size and mtime; `f` is the
+    # queue file, already locked by the caller
+    stamp = _queue_stamp(os.fstat(f.fileno()))
+    try:
+        with open(counters_file(queue_file)) as cf:
+            counters = json.load(cf)
+        if {key: counters.get(key) for key in stamp} == stamp:
+            return counters["batches"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def load_counters(f, tasks=None, queue_file=None):
+    # Anything that left the sidecar stale (hand edits, a crash between the two writes)
+    # rebuilds it from `tasks` or, if not given, from the file itself
+    batches = cached_counters(f, queue_file)
+    if batches is None:
+        if tasks is None:
+            f.seek(0)
+            tasks = list(csv.reader(f))[1:]
+        batches = count_tasks(tasks)
+    return batches
+
+def save_counters(f, batches, queue_file=None):
+    # Called after the queue write, still under the queue lock
+    f.flush()
+    path = counters_file(queue_file)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as cf:
+        # Batches keep queue order, which is also the order the scheduler serves them in
+        json.dump({**_queue_stamp(os.fstat(f.fileno())), "batches": batches}, cf)
+    os.replace(tmp, path)
+
+def write_queue(f, header, tasks, counters, queue_file=None):
+    if len(header) < len(QUEUE_HEADER):
+        header = QUEUE_HEADER
+    f.seek(0)
+    writer = csv.writer(f)
+    writer.writerow(header)
+    writer.writerows(tasks)
+    f.truncate()
+    save_counters(f, counters, queue_file)
+
+def modify_tasks(change, queue_file=None):
+    # Apply `change(row)` to every task under the queue lock; it edits the row in place and
+    # returns True when it did. Returns the changed rows (as they were before the change).
+    queue_file = queue_file or QUEUE_FILE
+    with open(queue_file, "r+", newline='') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        reader = list(csv.reader(f))
+        header, tasks = reader[0], reader[1:]
+        counters = load_counters(f, tasks, queue_file)
+        changed = []
+        for row in tasks:
+            if len(row) < 7:
+                continue
+            before = list(row)
+            if change(row):
+                changed.append(before)
+                if row[6] != before[6]:
+                    count_transition(counters, row[3], before[6], row[6])
+        if changed:
+            write_queue(f, header, tasks, counters, queue_file)
+        fcntl.flock(f, fcntl.LOCK_UN)
+    return changed
+
+def read_counters(queue_file=None):
+    # For readers outside the scheduler
+    queue_file = queue_file or QUEUE_FILE
+    if not os.path.exists(queue_file):
+        return {}
+    with open(queue_file, newline='') as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        batches = cached_counters(f, queue_file)
+        if batches is None:
+            # No writer can run while the shared lock is held, so the rebuild is safe to store
+            batches = load_counters(f, queue_file=queue_file)
+            save_counters(f, batches, queue_file)
+        fcntl.flock(f, fcntl.LOCK_UN)
+    return batches
+
+def completed_inputs_file(queue_file=None):
+    return os.path.join(os.path.dirname(queue_file or QUEUE_FILE), "completed_inputs.csv")
+
+def record_completed(stil_paths, xmode, batch_id, queue_file=None):
+    # Append-only; the last entry for a (path, xmode) wins
+    entries = []
+    for path in stil_paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append([path, xmode, st.st_size, st.st_mtime_ns, batch_id])
+    if not entries:
+        return
+    with open(completed_inputs_file(queue_file), "a", newline='') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        writer = csv.writer(f)
+        if f.tell() == 0:
+            writer.writerow(COMPLETED_INPUTS_HEADER)
+        writer.writerows(entries)
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+def completed_inputs(queue_file=None):
+    # {(path, xmode): (size, mtime_ns)} of inputs already converted successfully
+    path = completed_inputs_file(queue_file)
+    completed = {}
+    if os.path.exists(path):
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    completed[(row["STIL_Path"], row["XMode"])] = (int(row["Size"]), int(row["MTime"]))
+                except (KeyError, ValueError):
+                    continue
+    return completed
+
+def dispatch_log_file(queue_file=None):
+    return os.path.join(os.path.dirname(queue_file or QUEUE_FILE), "dispatch_log.json")
+
+def recent_dispatches(window_sec, queue_file=None):
+    # {user: [epoch, ...]} of task starts inside the window; read and written under the queue lock
+    try:
+        with open(dispatch_log_file(queue_file)) as f:
+            log = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    cutoff = time.time() - window_sec
+    return {user: [t for t in times if t >= cutoff] for user, times in log.items()}
+
+def record_dispatch(user, count, window_sec, queue_file=None):
+    log = recent_dispatches(window_sec, queue_file)
+    log.setdefault(user, []).extend([time.time()] * count)
+    path = dispatch_log_file(queue_file)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({user: times for user, times in log.items() if times}, f)
+    os.replace(tmp, path)
+
+def read_snapshot(queue_file=None, needle=None):
+    # Copy the queue under a shared lock and parse it after releasing, so readers hold the
+    # lock only for one read. `needle` drops lines not containing it before CSV parsing.
+    queue_file = queue_file or QUEUE_FILE
+    if not os.path.exists(queue_file):
+        return QUEUE_HEADER, []
+    with open(queue_file, newline='') as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        data = f.read()
+        fcntl.flock(f, fcntl.LOCK_UN)
+    lines = data.splitlines()
+    if not lines:
+        return QUEUE_HEADER, []
+    body = lines[1:] if needle is None else [line for line in lines[1:] if needle in line]
+    return next(csv.reader([lines[0]])), [row for row in csv.reader(body) if len(row) >= 7]
@@ -0,0 +1,138 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from config import BASE_DIR
+
+MANIFEST_DIR = os.path.join(BASE_DIR, "manifests")
+SYNC_STATE_NAME = ".release_sync.json"  # per-destination record of what was last copied
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def scan_tree(root):
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            st = os.stat(path)
+            files[os.path.relpath(path, root)] = {
+                "size": st.st_size,
+                "sha256": file_sha256(path),
+                "mtime": int(st.st_mtime),
+            }
+    return files
+
+def manifest_path(batch_id, project_name):
+    return os.path.join(MANIFEST_DIR, batch_id, f"{project_name}.json")
+
+def stage_manifest(staging_dir, publish_root, batch_id, project_name, stil_paths, setup_hash="", debug=False):
+    # Built from the staging tree, so paths are relative to the publish root. Written next to its
+    # final path; returns (tmp, path) for the caller to rename once the outputs are published.
+    manifest = {
+        "batch_id": batch_id,
+        "project_name": project_name,
+        "inputs": list(stil_paths),
+        "setup_hash": setup_hash,
+        "root": publish_root,
+        "generated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "files": scan_tree(staging_dir),
+    }
+    path = manifest_path(batch_id, project_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    if debug:
+        total = sum(entry["size"] for entry in manifest["files"].values())
+        print(f"[DEBUG] Manifest {path}: {len(manifest['files'])} file(s), {total / 1024 / 1024:.2f}MB")
+    return tmp, path
+
+def load_manifest(path):
+    with open(path) as f:
+        return json.load(f)
+
+def batch_manifests(batch_id):
+    return sorted(glob.glob(os.path.join(MANIFEST_DIR, glob.escape(batch_id), "*.json")))
+
+def _load_sync_state(dest):
+    try:
+        with open(os.path.join(dest, SYNC_STATE_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _store_sync_state(dest, state):
+    path = os.path.join(dest, SYNC_STATE_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def sync_release(manifest_files, dest, dry_run=False, debug=False):
+    # Copy only artifacts whose hash differs from what this destination last received
+    os.makedirs(dest, exist_ok=True)
+    state = _load_sync_state(dest)
+    copied = skipped = missing = 0
+    copied_bytes = 0
+    for manifest_file in manifest_files:
+        manifest = load_manifest(manifest_file)
+        for rel, entry in sorted(manifest["files"].items()):
+            target = os.path.join(dest, rel)
+            if state.get(rel) == entry["sha256"] and os.path.exists(target):
+                skipped += 1
+                continue
+            src = os.path.join(manifest["root"], rel)
+            if not os.path.exists(src):
+                print(f"[WARN] {src} listed in {manifest_file} no longer exists")
+                missing += 1
+                continue
+            if debug:
+                print(f"[DEBUG] {'Would copy' if dry_run else 'Copying'} {rel} ({entry['size']} bytes)")
+            if not dry_run:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.sync-{os.getpid()}")
+                shutil.copy2(src, tmp)
+                os.replace(tmp, target)
+                state[rel] = entry["sha256"]
+            copied += 1
+            copied_bytes += entry["size"]
+    if not dry_run:
+        _store_sync_state(dest, state)
+    print(f"[INFO] Synced to {dest}: {copied} copied ({copied_bytes / 1024 / 1024:.2f}MB), "
+          f"{skipped} unchanged, {missing} missing")
+    return copied, skipped, missing
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect output manifests and sync release artifacts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="List the artifacts recorded for a batch")
+    show.add_argument("batch_id")
+    sync = sub.add_parser("sync", help="Copy changed artifacts to a downstream location")
+    sync.add_argument("dest")
+    sync.add_argument("--batch", action="append", default=[], help="Batch ID to sync (repeatable)")
+    sync.add_argument("--manifest", action="append", default=[], help="Manifest file to sync (repeatable)")
+    sync.add_argument("--dry-run", action="store_true", help="Only report what would be copied")
+    parser.add_argument("--debug", action="store_true", help="Enable debug logs")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        for manifest_file in batch_manifests(args.batch_id):
+            manifest = load_manifest(manifest_file)
+            total = sum(entry["size"] for entry in manifest["files"].values())
+            print(f"{manifest['project_name']}: {len(manifest['files'])} file(s), "
+                  f"{total / 1024 / 1024:.2f}MB, generated {manifest['generated']}")
+    else:
+        manifests = list(args.manifest)
+        for batch_id in args.batch:
+            manifests += batch_manifests(batch_id)
+        if not manifests:
+            print("[ERROR] No manifests selected; use --batch or --manifest")
+            raise SystemExit(1)
+        sync_release(manifests, args.dest, args.dry_run, args.debug)
@@ -3,26 +3,44 @@ import getpass
 import csv
 import os
 import fcntl
-import json
 from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from collections import defaultdict
-import time
+import math
+import socket
+import threading
+from collections import Counter
 from pathlib import Path
+import setup_profiles
+import setup_check
+import setup_tuning
+import staging
+import release_manifest
+import output_report
+import deadlines
+import disk_admission
+import config
+import executors
+import lanes
+import log_store
+import notify
+import queue_store
+import run_state
+from config import BASE_DIR, EXECUTION_LOG_FILE, LOCAL_SUFFIX, MAX_LICENSE, OUTPUT_DIR
+from queue_store import encode_overrides, task_overrides
 
 # === CONFIGURATION ===
-MAX_LICENSE = 1
-BASE_DIR = "/work/kimhuang/1_Python/8_stilManager"
-CONFIG_FILE = os.path.join(BASE_DIR, "repack_config.json")
 QUEUE_FILE = os.path.join(BASE_DIR, "task_queue.csv")
-EXECUTION_LOG_FILE = os.path.join(BASE_DIR, "execution_log.csv")
-LOCK_FILE = "/tmp/mission_scheduler.lock"
+LOCK_FILE = f"/tmp/mission_scheduler{LOCAL_SUFFIX}.lock"  # host-local; --worker mode relies on queue leases instead
 LOG_DIR = os.path.join(BASE_DIR, "logs")
-OUTPUT_DIR = "/projects/ga0/patterns/release_pattern"
-SETUP_FILE = "/work/kimhuang/1_Python/8_stilManager/smt8p7_setup.py"
-SETUP_X4_FILE = "/work/kimhuang/1_Python/8_stilManager/smt8p7_setupx4.py"
-SIZE_THRESHOLD = 20 * 1024 * 1024  # 20MB in bytes
+SIZE_THRESHOLD = lanes.SIZE_THRESHOLD  # 20MB in bytes
+BATCH_MAX_TASKS = 50  # max patterns per multi-input ategen run in --batch-mode
+ADMISSION_CANDIDATES = 3  # tasks (or batch groups) tried per cycle when the first does not fit on disk
+QUOTA_WINDOW_SEC = 3600
+# Per-user limits from the "quotas" section of repack_config.json, 0 = unlimited:
+#   {"default": {"slots": 0, "tasks_per_hour": 0}, "users": {"kimhuang": {"slots": 1, "tasks_per_hour": 20}}}
+DEFAULT_QUOTA = {"slots": 0, "tasks_per_hour": 0}
+LEASE_SEC = 300  # a claim not renewed for this long is handed to another worker
+HEARTBEAT_SEC = 60
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
 VALID_XMODES = ["", "4"]  # 定義有效 xmode 值
 
 def skip_if_too_many_jobs(debug=False):
@@ -40,28 +58,6 @@ def skip_if_too_many_jobs(debug=False):
     except Exception as e:
         print(f"[ERROR] Failed to check squeue: {e}")
 
-def load_config():
-    with open(CONFIG_FILE) as f:
-        return json.load(f)
-
-def send_email(sender_email, sender_password, to_email, subject, body, debug=False):
-    msg = MIMEText(body)
-    msg["From"] = sender_email
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    if debug:
-        print(f"[DEBUG] Sending email to {to_email} with subject: {subject}")
-        print(f"[DEBUG] Email body:\n{body}")
-    try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(sender_email, sender_password)
-            server.send_message(msg)
-        if debug:
-            print(f"[DEBUG] Email sent successfully")
-    except Exception as e:
-        print(f"[WARN] Email not sent: {e}")
-
 def extract_file_base(filepath: str) -> str:
     name = Path(filepath.strip()).name
     stem = Path(name).stem
@@ -69,107 +65,498 @@ def extract_file_base(filepath: str) -> str:
         stem = Path(stem).stem
     return stem.rstrip("_")
 
-def run_stil_command(stil_path, batch_id, log_path, xmode="", debug=False):
-    project_name = extract_file_base(stil_path)
+def resolve_setup_file(xmode, overrides=None, debug=False):
+    setup_file = setup_profiles.setup_for_xmode(xmode, overrides, debug)
+    if debug:
+        print(f"[DEBUG] Using setup file: {setup_file} for xmode: {xmode}")
+    return setup_file
+
+def prepare_setup(xmode, overrides=None, debug=False):
+    # Resolve the hashed setup artifact up front so it can be logged with the result.
+    # Returns (setup_file, setup_hash, error); a task with an error must not run.
+    if xmode not in VALID_XMODES:
+        return None, "", f"[ERROR] Invalid xmode: {xmode}. Must be one of {VALID_XMODES}"
+    try:
+        setup_file = resolve_setup_file(xmode, overrides, debug)
+        problems = setup_check.validate_setup(setup_file, debug=debug)
+        if problems:
+            error_msg = f"[ERROR] Setup {setup_file} failed validation:\n  " + "\n  ".join(problems)
+            print(error_msg)
+            return None, "", error_msg
+        return setup_file, setup_profiles.setup_hash_of(setup_file), ""
+    except Exception as e:
+        error_msg = f"[ERROR] Failed to resolve setup for xmode {xmode!r} with overrides {overrides}: {e}"
+        print(error_msg)
+        return None, "", error_msg
+
+def setup_failure(error_msg):
+    now = datetime.now()
+    return False, error_msg, now, now, 0.0
+
+def task_workdir(batch_id):
+    # Tuning experiments convert the same pattern several times; keep them out of the release area
+    if setup_tuning.is_experiment_batch(batch_id):
+        return os.path.join(setup_tuning.EXPERIMENT_DIR, batch_id)
+    return OUTPUT_DIR
+
+def project_for(name, batch_id, overrides):
+    # Tuning variants of the same pattern (or batch) each get their own project, outputs and manifest
+    if setup_tuning.is_experiment_batch(batch_id):
+        return f"{name}_{setup_tuning.variant_tag(overrides)}"
+    return name
+
+def lane_lock_file(lane=None):
+    return LOCK_FILE if lane is None else f"{os.path.splitext(LOCK_FILE)[0]}.{lane}.lock"
+
+def publish_fenced(fence, task_keys, publish, debug=False):
+    # Runs publish() only while this worker still holds the leases of fence `fence` on the run's tasks.
+    # The check, a lease renewal and the publish all happen under the queue lock, so the rows cannot be
+    # reclaimed or cancelled in between and are still held when finish_tasks records the result;
+    # publish() should only rename what was prepared beforehand, as every queue user waits on it.
+    # Returns False, without publishing, when the leases were lost. fence None publishes unconditionally.
+    if fence is None:
+        publish()
+        return True
+    with open(QUEUE_FILE, "r+", newline='') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            reader = list(csv.reader(f))
+            header, tasks = reader[0], reader[1:]
+            held = [row for row in tasks if len(row) >= 7 and row[6] == "RUNNING"
+                    and queue_store.holds_lease(row, WORKER_ID, fence) and queue_store.task_key(row) in task_keys]
+            if not held:
+                return False
+            counters = queue_store.load_counters(f, tasks, QUEUE_FILE)
+            for row in held:
+                queue_store.grant_lease(row, WORKER_ID, fence, LEASE_SEC)
+            write_queue(f, header, tasks, counters)
+            if debug:
+                print(f"[DEBUG] Publishing under fence {fence} ({len(held)} lease(s) held)")
+            publish()
+            return True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def run_staged(stil_paths, batch_id, project_name, log_path, setup_file, size_bytes, debug=False, shared_staging=None,
+               task_keys=(), lane=None, setup_renderer=None, fence=None, backend=None):
+    # ategen writes into a private staging dir; outputs reach the release area only on success.
+    # Slurm runs stage on the shared filesystem because the compute node cannot see local scratch.
+    # setup_renderer(staging_dir) renders the run's setup once settings can point into the staging dir;
+    # the manifest keeps the hash of `setup_file` so runs with the same settings share it.
+    slurm = (lane or lanes.home_lane(size_bytes)) == "slurm"
+    if shared_staging is None:
+        shared_staging = slurm
+    staging_dir = staging.create_staging_dir(project_name, shared=shared_staging, debug=debug)
+    success = lost = False
+    try:
+        setup_hash = setup_profiles.setup_hash_of(setup_file)
+        if setup_renderer:
+            setup_file = setup_renderer(staging_dir)
+        executor = executors.executor_for(slurm, config.load_config(), backend)
+        print(f"[INFO] Input ({size_bytes / 1024 / 1024:.2f}MB) running with the {executor.name} executor.")
+        success, output, start_time, end_time, duration = executor.run(
+            stil_paths, project_name, log_path, setup_file, staging_dir, run_state.job_name(batch_id, task_keys),
+            batch_id, task_keys, debug)
+        if success:
+            dest = task_workdir(batch_id)
+            manifest, moves = None, []
+
+            def publish():
+                staging.commit_publish(moves, staging_dir, dest, debug)
+                if manifest:
+                    try:
+                        os.replace(*manifest)
+                    except OSError as e:
+                        print(f"[WARN] Failed to write output manifest for {project_name}: {e}")
+
+            try:
+                # Hashing and copying happen here, outside the queue lock publish_fenced takes for the renames
+                try:
+                    manifest = release_manifest.stage_manifest(staging_dir, dest, batch_id, project_name, stil_paths,
+                                                               setup_hash, debug)
+                except OSError as e:
+                    print(f"[WARN] Failed to write output manifest for {project_name}: {e}")
+                moves = staging.prepare_publish(staging_dir, dest, debug)
+                held = publish_fenced(fence, task_keys, publish, debug)
+            except OSError as e:
+                success = False
+                output += f"\n[ERROR] Failed to publish outputs to {dest}: {e}"
+                print(f"[ERROR] Failed to publish outputs to {dest}: {e}")
+            else:
+                if not held:
+                    success, lost = False, True
+                    output += f"\n[WARN] Leases with fence {fence} were lost before publishing; outputs discarded"
+                    print(f"[WARN] Leases with fence {fence} were lost before publishing; discarding {staging_dir}")
+            if not success:
+                staging.abort_publish(moves + ([manifest] if manifest else []), staging_dir)
+        return success, output, start_time, end_time, duration
+    finally:
+        # Outputs of a run whose tasks were taken away are never kept, even for debugging
+        staging.discard_staging(staging_dir, failed=not success and not lost, debug=debug)
+
+def run_stil_command(stil_path, batch_id, log_path, xmode="", debug=False, setup_file=None, shared_staging=None,
+                     task_keys=(), lane=None, project_name=None, fence=None, backend=None):
+    project_name = project_name or extract_file_base(stil_path)
     
     if xmode not in VALID_XMODES:
         error_msg = f"[ERROR] Invalid xmode: {xmode}. Must be one of {VALID_XMODES}"
         print(error_msg)
         return False, error_msg, datetime.now(), datetime.now(), 0.0
 
-    setup_file = SETUP_X4_FILE if xmode == "4" else SETUP_FILE
-    if debug:
-        print(f"[DEBUG] Using setup file: {setup_file} for xmode: {xmode}")
-
-    ategen_cmd = (
-        f"ategen "
-        f"-input_file_type:STIL "
-        f"-workdir:{OUTPUT_DIR} "
-        f"-project_name:{project_name} "
-        f"-logfile:{log_path} "
-        f"-setup:{setup_file} "
-        f"-licwait "
-        f"-timestamp "
-        f"{stil_path}"
-    )
-
     try:
+        if setup_file is None:
+            setup_file = resolve_setup_file(xmode, debug=debug)
         file_size = os.path.getsize(stil_path)
         if debug:
             print(f"[DEBUG] STIL file size: {file_size / 1024 / 1024:.2f}MB")
-        if file_size < SIZE_THRESHOLD:
-            print(f"[INFO] File {stil_path} ({file_size / 1024 / 1024:.2f}MB) is < 20MB, running locally.")
-            cmd = (
-                f"bash -c '"
-                f"source /etc/profile && "
-                f"module load tdl && "
-                f"{ategen_cmd}'"
-            )
-        else:
-            print(f"[INFO] File {stil_path} ({file_size / 1024 / 1024:.2f}MB) is >= 20MB, running on Slurm.")
-            cmd = (
-                f"srun -p hw-h --mem=32G --cpus-per-task=2 bash -c '"
-                f"source /etc/profile && "
-                f"module load tdl && "
-                f"{ategen_cmd}'"
-            )
+        return run_staged([stil_path], batch_id, project_name, log_path, setup_file, file_size, debug, shared_staging,
+                          task_keys, lane, fence=fence, backend=backend)
+    except Exception as e:
+        now = datetime.now()
+        print(f"[ERROR] Command execution failed: {e}")
+        return False, str(e), now, now, 0.0
 
+def batch_setup_renderer(xmode, overrides, batch_id, project_name, debug=False):
+    # Shared combinations file keeps timing consistent across all patterns of the run. It is written into the
+    # project dir in staging, so it is published (or discarded) with the outputs; the setup naming it goes there too.
+    def render(staging_dir):
+        project_dir = os.path.join(staging_dir, project_name)
+        combinations = os.path.join(project_dir, f"{batch_id}_combinations.txt")
+        return setup_profiles.setup_for_xmode(xmode, {**overrides, "smt8_combinations_file": combinations}, debug,
+                                              cache_dir=project_dir)
+    return render
+
+def run_stil_batch_command(stil_paths, batch_id, log_path, xmode="", debug=False, setup_file=None, shared_staging=None,
+                           task_keys=(), lane=None, project_name=None, overrides=None, fence=None, backend=None):
+    if xmode not in VALID_XMODES:
+        error_msg = f"[ERROR] Invalid xmode: {xmode}. Must be one of {VALID_XMODES}"
+        print(error_msg)
+        return False, error_msg, datetime.now(), datetime.now(), 0.0
+
+    try:
+        overrides = overrides or {}
+        project_name = project_name or batch_id
+        if setup_file is None:
+            setup_file = resolve_setup_file(xmode, overrides, debug)
+        # Slurm placement follows the largest single input, not the sum
+        max_size = max(os.path.getsize(path) for path in stil_paths)
         if debug:
-            print(f"[DEBUG] Executing command: {cmd}")
-
-        start_time = datetime.now()
-        start_sec = time.time()
-        result = subprocess.run(
-            ["bash", "-c", cmd],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True
-        )
-        end_sec = time.time()
-        end_time = datetime.now()
-        duration = round(end_sec - start_sec, 2)
-        output = result.stdout + "\n" + result.stderr
-        if debug:
-            print(f"[DEBUG] Command output:\n{output}")
-            print(f"[DEBUG] Execution duration: {duration}s")
-        return result.returncode == 0, output, start_time, end_time, duration
+            print(f"[DEBUG] Batch of {len(stil_paths)} STIL file(s), largest {max_size / 1024 / 1024:.2f}MB")
+        return run_staged(stil_paths, batch_id, project_name, log_path, setup_file, max_size, debug, shared_staging,
+                          task_keys, lane, batch_setup_renderer(xmode, overrides, batch_id, project_name, debug), fence,
+                          backend)
     except Exception as e:
         now = datetime.now()
-        print(f"[ERROR] Command execution failed: {e}")
+        print(f"[ERROR] Batch command execution failed: {e}")
         return False, str(e), now, now, 0.0
 
-def group_tasks_by_batch(tasks, debug=False):
-    batches = defaultdict(list)
-    for row in tasks:
-        batches[row[3]].append(row)
+def split_batch_results(stil_paths, project_dir, success, output, debug=False):
+    # Map one multi-input ategen result back onto per-task statuses.
+    # Returns {stil_path: "COMPLETE" | "FAILED" | "PENDING"}; PENDING means the
+    # task was not at fault and should be retried.
+    bases = {path: extract_file_base(path) for path in stil_paths}
+    error_lines = [line for line in output.splitlines() if "ERROR" in line.upper()]
+    blamed_bases = set()
+    for line in error_lines:
+        blamed_bases |= output_report.named_bases(line, bases.values())
+    blamed = {path for path, base in bases.items() if base in blamed_bases}
+
+    produced_bases = set()
+    if os.path.isdir(project_dir):
+        for _, _, files in os.walk(project_dir):
+            for name in files:
+                produced_bases |= output_report.named_bases(name, bases.values())
+    produced = {path for path, base in bases.items() if base in produced_bases}
+
+    results = {}
+    for path in stil_paths:
+        if success:
+            results[path] = "COMPLETE" if path in produced and path not in blamed else "FAILED"
+        elif blamed:
+            results[path] = "FAILED" if path in blamed else "PENDING"
+        else:
+            results[path] = "FAILED"
     if debug:
-        print(f"[DEBUG] Grouped {len(tasks)} tasks into {len(batches)} batches")
-        for batch_id, batch_tasks in batches.items():
-            print(f"[DEBUG] Batch {batch_id}: {len(batch_tasks)} tasks")
-    return batches
-
-def log_execution(start_time, end_time, batch_id, stil_path, duration, status, debug=False):
-    file_exists = os.path.exists(EXECUTION_LOG_FILE)
-    with open(EXECUTION_LOG_FILE, "a", newline='') as f:
-        writer = csv.writer(f)
-        if not file_exists:
-            writer.writerow(["StartTime", "EndTime", "BatchID", "STIL_Path", "Duration_sec", "Status"])
-        writer.writerow([
-            start_time.strftime("%Y-%m-%d %H:%M:%S"),
-            end_time.strftime("%Y-%m-%d %H:%M:%S"),
-            batch_id,
-            stil_path,
-            duration,
-            status
-        ])
+        print(f"[DEBUG] Batch split: {sum(1 for s in results.values() if s == 'COMPLETE')} complete, "
+              f"{sum(1 for s in results.values() if s == 'FAILED')} failed, "
+              f"{sum(1 for s in results.values() if s == 'PENDING')} requeued")
+    return results
+
+EXECUTION_LOG_HEADER = ["StartTime", "EndTime", "BatchID", "STIL_Path", "Duration_sec", "Status", "SetupHash",
+                        "InputBytes", "PeakRSS_KB", "VectorMemory", "Overrides", "OutputBytes", "PatternBytes"]
+
+def upgrade_log_header(path, header):
+    # Older logs carry fewer columns; rewrite the header once so new columns stay aligned
+    with open(path, newline='') as f:
+        current = next(csv.reader(f), [])
+        if current == header:
+            return
+        rest = f.read()
+    with open(path + ".tmp", "w", newline='') as f:
+        csv.writer(f).writerow(header)
+        f.write(rest)
+    os.replace(path + ".tmp", path)
+
+def log_execution(start_time, end_time, batch_id, stil_path, duration, status, debug=False, extra=None):
+    # `extra` fills the optional columns after Status, keyed by header name
+    extra = extra or {}
+    # Concurrent schedulers (workers, lanes) share the log; rotation and the header rewrite replace the file
+    with log_store.lock_execution_log(EXECUTION_LOG_FILE):
+        log_store.rotate_execution_log(EXECUTION_LOG_FILE, debug=debug)
+        file_exists = os.path.exists(EXECUTION_LOG_FILE)
+        if file_exists:
+            upgrade_log_header(EXECUTION_LOG_FILE, EXECUTION_LOG_HEADER)
+        with open(EXECUTION_LOG_FILE, "a", newline='') as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(EXECUTION_LOG_HEADER)
+            writer.writerow([
+                start_time.strftime("%Y-%m-%d %H:%M:%S"),
+                end_time.strftime("%Y-%m-%d %H:%M:%S"),
+                batch_id,
+                stil_path,
+                duration,
+                status
+            ] + ["" if extra.get(column) is None else extra[column] for column in EXECUTION_LOG_HEADER[6:]])
     if debug:
         print(f"[DEBUG] Logged execution: BatchID={batch_id}, STIL_Path={stil_path}, Status={status}")
 
-def process_first_pending_task(debug=False):
-    config = load_config()
-    email_config = config["email"]
-    sender_email = email_config["from"]
-    sender_password = email_config["password"]
+def record_completed(stil_paths, xmode, batch_id):
+    # Lets directory submissions skip unchanged inputs; experiments are not releases
+    if setup_tuning.is_experiment_batch(batch_id):
+        return
+    try:
+        queue_store.record_completed(stil_paths, xmode, batch_id, QUEUE_FILE)
+    except OSError as e:
+        print(f"[WARN] Failed to record completed inputs: {e}")
+
+def dispatch_headroom(tasks, debug=False):
+    # Returns headroom(user): how many more tasks the user may start now under their quotas
+    quotas = config.load_config().get("quotas", {})
+    running = Counter(row[1] for row in tasks if len(row) >= 7 and row[6] == "RUNNING")
+    started = {user: len(times) for user, times in queue_store.recent_dispatches(QUOTA_WINDOW_SEC, QUEUE_FILE).items()}
+    reported = set()
+
+    def headroom(user):
+        limits = {**DEFAULT_QUOTA, **quotas.get("default", {}), **quotas.get("users", {}).get(user, {})}
+        left = math.inf
+        if limits["slots"]:
+            left = min(left, limits["slots"] - running[user])
+        if limits["tasks_per_hour"]:
+            left = min(left, limits["tasks_per_hour"] - started.get(user, 0))
+        if debug and left <= 0 and user not in reported:
+            reported.add(user)
+            print(f"[DEBUG] {user} is at quota ({running[user]} running, {started.get(user, 0)} started this hour)")
+        return left
+
+    return headroom
+
+def admit_tasks(stil_paths, batch_id, debug=False, lane=None):
+    # Returns (admitted, shared_staging); admission errors never block dispatch
+    try:
+        prefer_shared = (lane or lanes.home_lane(max(os.path.getsize(path) for path in stil_paths))) == "slurm"
+        admitted, shared_staging, reason = disk_admission.check_admission(
+            stil_paths, task_workdir(batch_id), LOG_DIR, staging.LOCAL_SCRATCH_DIR, staging.SHARED_STAGING_DIR,
+            prefer_shared, EXECUTION_LOG_FILE, debug)
+    except Exception as e:
+        print(f"[WARN] Disk admission check failed, dispatching anyway: {e}")
+        return True, None
+    if not admitted:
+        print(f"[INFO] Deferring batch {batch_id}: {reason}")
+    return admitted, shared_staging
+
+def run_metrics(stil_paths, output, log_path, overrides, setup_hash, project_name, batch_id, success, peak_rss_kb=None):
+    # Per-task extra execution log columns, keyed by STIL path; peak_rss_kb is for the whole run
+    shared = {
+        "SetupHash": setup_hash,
+        "PeakRSS_KB": peak_rss_kb,
+        "Overrides": encode_overrides(overrides),
+    }
+    bases = {path: extract_file_base(path) for path in stil_paths}
+
+    # The summary goes to stdout and to ategen's -logfile; fall back to the logfile only
+    # when stdout has none, and read it before the scheduler appends the captured output.
+    vectors = output_report.vector_memory_by_pattern(output, bases.values())
+    if not vectors and os.path.exists(log_path):
+        with open(log_path, errors="replace") as log:
+            vectors = output_report.vector_memory_by_pattern(log.read(), bases.values())
+
+    output_bytes, pattern_bytes = None, {}
+    manifest_file = release_manifest.manifest_path(batch_id, project_name)
+    if success and os.path.exists(manifest_file):
+        try:
+            output_bytes, pattern_bytes = output_report.manifest_accounting(
+                release_manifest.load_manifest(manifest_file), bases.values())
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Failed to read manifest {manifest_file}: {e}")
+
+    metrics = {}
+    for path, base in bases.items():
+        try:
+            input_bytes = os.path.getsize(path)
+        except OSError:
+            input_bytes = None
+        vector_memory = vectors.get(base)
+        if vector_memory is None and len(stil_paths) == 1:
+            vector_memory = vectors.get("")
+        metrics[path] = {
+            **shared,
+            "InputBytes": input_bytes,
+            "VectorMemory": vector_memory,
+            "OutputBytes": output_bytes,
+            "PatternBytes": pattern_bytes.get(base),
+        }
+    return metrics
+
+def same_task(row, batch_id, stil_path, overrides):
+    # A tuning batch queues the same STIL path once per setup variant
+    return row[3] == batch_id and row[4] == stil_path and task_overrides(row) == overrides
+
+def write_queue(f, header, tasks, counters):
+    queue_store.write_queue(f, header, tasks, counters, QUEUE_FILE)
+
+def batch_rows(tasks, batch_id):
+    # Snapshot taken while the queue is still locked for the status update
+    return [list(row) for row in tasks if len(row) >= 7 and row[3] == batch_id]
+
+def notify_batch(batch_id, counts, rows, submitted_by, submitter_email, newly_failed, debug=False):
+    # `counts` are the batch counters after this transition; `rows` only feed the message body
+    passed, failed, cancelled = counts.get("complete", 0), counts.get("failed", 0), counts.get("cancelled", 0)
+    if queue_store.batch_finished(counts):
+        summary = "\n".join([f"{row[4]}  -->  {row[6]}" for row in rows])
+        status_tag = "FAIL" if failed else "CANCELLED" if cancelled else "PASS"
+        subject = f"[{status_tag}] Pattern Release : {batch_id}"
+        body = f"Batch: {batch_id}\n\nSummary:\n{summary}\n\nResult: {passed} Passed, {failed} Failed"
+        if cancelled:
+            body += f", {cancelled} Cancelled"
+        try:
+            report, _ = output_report.batch_report(batch_id, EXECUTION_LOG_FILE)
+            body += "\n\nOutput report:\n" + "\n".join(report)
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Output report unavailable for {batch_id}: {e}")
+        event = {"type": "batch_complete", "batch_id": batch_id, "passed": passed, "failed": failed,
+                 "cancelled": cancelled, "total": counts["total"]}
+    elif newly_failed and failed == len(newly_failed):
+        # First failure(s) of a batch still in progress; sent only to users who opted in
+        remaining = counts["total"] - passed - failed
+        subject = f"[FAIL] Pattern Release : {batch_id} (in progress)"
+        body = (f"Batch: {batch_id}\n\nFailed:\n" + "\n".join(newly_failed)
+                + f"\n\n{remaining} of {counts['total']} task(s) still pending or running.")
+        event = {"type": "first_failure", "batch_id": batch_id, "failed": newly_failed, "total": counts["total"]}
+    else:
+        return
+    if notify.queue_notification(submitted_by, submitter_email, subject, body, event, debug=debug):
+        notify.start_sender(debug)
+
+def select_next(tasks, headroom, edf=False, debug=False, accept=None):
+    # --edf serves deadline batches first, in the order that keeps the most of them on time;
+    # everything else (and the default mode) goes by aged priority
+    eligible = lambda row: headroom(row[1]) > 0 and (accept is None or accept(row))
+    if edf:
+        row = deadlines.next_by_deadline(tasks, eligible, deadlines.duration_estimator(EXECUTION_LOG_FILE),
+                                         MAX_LICENSE, debug=debug)
+        if row is not None:
+            return row
+    return queue_store.next_pending(tasks, eligible)
+
+def licenses_exhausted(load, debug=False):
+    # Every ategen run holds a license once it starts; RUNNING rows cover the runs of all hosts and lanes.
+    # Slurm runs still waiting in the partition have not checked one out yet (ategen -licwait).
+    # Returns (no license left, Slurm backlog or None when it was not queried).
+    backlog = lanes.slurm_backlog(debug) if load["slurm"] else None
+    in_use = sum(load.values()) - min(backlog or 0, load["slurm"])
+    if debug:
+        print(f"[DEBUG] ategen licenses in use: {in_use}/{MAX_LICENSE}, runs per lane: {dict(load)}")
+    if in_use >= MAX_LICENSE:
+        print(f"[INFO] All {MAX_LICENSE} ategen license(s) in use ({dict(load)} running).")
+        return True, backlog
+    return False, backlog
+
+def select_any(tasks, candidates, headroom, edf=False, debug=False):
+    if licenses_exhausted(lanes.lane_load(tasks), debug)[0]:
+        return None
+    return select_next(candidates, headroom, edf, debug)
+
+def select_for_lane(tasks, candidates, headroom, lane, edf=False, debug=False):
+    # A lane worker serves tasks homed on its lane first and steals from the other lane only when
+    # it has nothing of its own and the other lane is congested
+    load = lanes.lane_load(tasks)
+    exhausted, backlog = licenses_exhausted(load, debug)
+    if exhausted:
+        return None
+    if load[lane] >= lanes.LANE_SLOTS[lane]:
+        print(f"[INFO] {lane} lane is full ({load[lane]}/{lanes.LANE_SLOTS[lane]} running).")
+        return None
+    homes = {}
+
+    def home(row):
+        if row[4] not in homes:
+            homes[row[4]] = lanes.task_lane(row)
+        return homes[row[4]]
+
+    row = select_next(candidates, headroom, edf, debug, lambda row: home(row) == lane)
+    if row is None:
+        reason = lanes.steal_reason(lane, load, debug, backlog)
+        if reason:
+            row = select_next(candidates, headroom, edf, debug, lambda row: home(row) != lane)
+            if row is not None:
+                print(f"[INFO] {lane} lane takes {row[4]} from the {home(row)} lane: {reason}")
+    return row
+
+def reclaim_leases(tasks, counters, debug=False):
+    reclaimed = queue_store.reclaim_expired(tasks, counters)
+    for row, worker in reclaimed:
+        print(f"[WARN] Lease of {worker} on {row[4]} ({row[3]}) expired; task requeued")
+    return bool(reclaimed)
+
+def start_heartbeat(fence, debug=False):
+    # Renews this worker's leases while ategen runs; set the returned event to stop
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(HEARTBEAT_SEC):
+            try:
+                held = queue_store.renew_leases(WORKER_ID, fence, LEASE_SEC, QUEUE_FILE)
+            except OSError as e:
+                print(f"[WARN] Lease renewal failed: {e}")
+                continue
+            if not held:
+                print(f"[WARN] Leases with fence {fence} were lost; results of this run will be discarded")
+                return
+            if debug:
+                print(f"[DEBUG] Renewed {held} lease(s) with fence {fence}")
+
+    threading.Thread(target=beat, daemon=True).start()
+    return stop
+
+def finish_tasks(batch_id, overrides, results, fence):
+    # Applies {stil_path: status} to the rows this worker still holds. Returns the final
+    # status per path (CANCELLED or LEASE_LOST when the row was taken away meanwhile),
+    # the batch counters and, when the batch is done, its rows for the notification.
+    final = {}
+    with open(QUEUE_FILE, "r+", newline='') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        reader = list(csv.reader(f))
+        header = reader[0]
+        tasks = reader[1:]
+        counters = queue_store.load_counters(f, tasks, QUEUE_FILE)
+        for row in tasks:
+            if row[4] not in results or not same_task(row, batch_id, row[4], overrides):
+                continue
+            if row[6] == "RUNNING" and queue_store.holds_lease(row, WORKER_ID, fence):
+                row[6] = final[row[4]] = results[row[4]]
+                queue_store.release_lease(row)
+                queue_store.count_transition(counters, batch_id, "RUNNING", row[6])
+            elif row[6] == "CANCELLED":
+                final.setdefault(row[4], "CANCELLED")
+        write_queue(f, header, tasks, counters)
+        rows = batch_rows(tasks, batch_id) if queue_store.batch_finished(counters[batch_id]) else []
+        fcntl.flock(f, fcntl.LOCK_UN)
+    for path in results:
+        final.setdefault(path, "LEASE_LOST")
+    return final, counters[batch_id], rows
+
+def process_first_pending_task(debug=False, edf=False, lane=None, backend=None):
     os.makedirs(LOG_DIR, exist_ok=True)
 
     with open(QUEUE_FILE, "r+", newline='') as f:
@@ -177,6 +564,9 @@ def process_first_pending_task(debug=False):
         reader = list(csv.reader(f))
         header = reader[0]
         tasks = reader[1:]
+        counters = queue_store.load_counters(f, tasks, QUEUE_FILE)
+        if reclaim_leases(tasks, counters, debug):
+            write_queue(f, header, tasks, counters)
         pending_tasks = [row for row in tasks if len(row) >= 7 and row[6] == "PENDING"]
         if debug:
             print(f"[DEBUG] Loaded {len(tasks)} tasks, {len(pending_tasks)} pending")
@@ -185,91 +575,224 @@ def process_first_pending_task(debug=False):
             fcntl.flock(f, fcntl.LOCK_UN)
             return
 
-        batches = group_tasks_by_batch(tasks, debug)
-        first_batch = next((batch_id for batch_id, rows in batches.items() if any(len(row) >= 7 and row[6] == "PENDING" for row in rows)), None)
-        if not first_batch:
-            print("[INFO] No pending batches found.")
-            fcntl.flock(f, fcntl.LOCK_UN)
-            return
-
-        batch_tasks = [row for row in tasks if row[3] == first_batch]
-        current_task = next(row for row in batch_tasks if len(row) >= 7 and row[6] == "PENDING")
-        
-        if len(current_task) < 7:
-            print(f"[ERROR] Invalid task format: {current_task}. Skipping.")
+        headroom = dispatch_headroom(tasks, debug)
+        # A task that does not fit on disk is passed over for the next candidate before giving up the cycle
+        deferred = set()
+        for _ in range(ADMISSION_CANDIDATES):
+            candidates = [row for row in pending_tasks if id(row) not in deferred]
+            if lane:
+                current_task = select_for_lane(tasks, candidates, headroom, lane, edf, debug)
+            else:
+                current_task = select_any(tasks, candidates, headroom, edf, debug)
+            if current_task is None:
+                break
+            admitted, shared_staging = admit_tasks([current_task[4]], current_task[3], debug, lane)
+            if admitted:
+                break
+            deferred.add(id(current_task))
+            current_task = None
+        if current_task is None:
+            if not deferred:
+                print(f"[INFO] All pending tasks are held back by licenses, per-user quotas"
+                      f"{' or lane limits' if lane else ''}.")
             fcntl.flock(f, fcntl.LOCK_UN)
             return
 
-        timestamp, submitted_by, submitter_email, batch_id, stil_path, xmode, status = current_task
+        timestamp, submitted_by, submitter_email, batch_id, stil_path, xmode, status = current_task[:7]
+        overrides = task_overrides(current_task)
+        task_keys = [queue_store.task_key(current_task)]
         if debug:
-            print(f"[DEBUG] Processing task: BatchID={batch_id}, STIL_Path={stil_path}, XMode={xmode}")
+            print(f"[DEBUG] Processing task: BatchID={batch_id}, STIL_Path={stil_path}, XMode={xmode}, Overrides={overrides}")
 
-        for row in tasks:
-            if row == current_task:
-                row[6] = "RUNNING"
-                break
+        fence = queue_store.next_fence(tasks)
+        current_task[6] = "RUNNING"
+        queue_store.grant_lease(current_task, WORKER_ID, fence, LEASE_SEC)
+        current_task[lanes.LANE_COLUMN] = lane or lanes.task_lane(current_task)
+        queue_store.count_transition(counters, batch_id, "PENDING", "RUNNING")
+        queue_store.record_dispatch(submitted_by, 1, QUOTA_WINDOW_SEC, QUEUE_FILE)
 
-        f.seek(0)
-        writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(tasks)
-        f.truncate()
+        write_queue(f, header, tasks, counters)
         fcntl.flock(f, fcntl.LOCK_UN)
 
-    log_filename = os.path.join(LOG_DIR, f"{batch_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+    log_filename = log_store.new_log_path(batch_id, LOG_DIR)
+    project_name = project_for(extract_file_base(stil_path), batch_id, overrides)
     print(f"[EXECUTE] Running ategen on {stil_path}")
-    success, output, start_time, end_time, duration = run_stil_command(stil_path, batch_id, log_filename, xmode, debug)
+    heartbeat = start_heartbeat(fence, debug)
+    try:
+        setup_file, setup_hash, setup_error = prepare_setup(xmode, overrides, debug)
+        if setup_error:
+            success, output, start_time, end_time, duration = setup_failure(setup_error)
+        else:
+            success, output, start_time, end_time, duration = run_stil_command(stil_path, batch_id, log_filename, xmode,
+                                                                               debug, setup_file, shared_staging, task_keys,
+                                                                               lane, project_name, fence, backend)
+    finally:
+        heartbeat.set()
+
+    # A task this worker no longer holds was cancelled or reclaimed meanwhile; its result is discarded
+    final, batch_counts, rows = finish_tasks(batch_id, overrides, {stil_path: "COMPLETE" if success else "FAILED"}, fence)
+    final_status = final[stil_path]
+
+    metrics = run_metrics([stil_path], output, log_filename, overrides, setup_hash, project_name, batch_id, success,
+                          executors.peak_rss_kb(run_state.job_name(batch_id, task_keys)))
+    with open(log_filename, "a") as log:
+        log.write(f"[{datetime.now()}] {'SUCCESS' if success else 'FAILED'}:\n{output}\n")
+    log_store.finalize_task_log(batch_id, [stil_path], log_filename, debug)
+    log_execution(start_time, end_time, batch_id, stil_path, duration, final_status, debug, metrics[stil_path])
+    if final_status == "COMPLETE" and not overrides:
+        record_completed([stil_path], xmode, batch_id)
+
+    notify_batch(batch_id, batch_counts, rows, submitted_by, submitter_email,
+                 [stil_path] if final_status == "FAILED" else [], debug)
+
+def batch_group(tasks, first_task, headroom, lane=None):
+    # Only tasks sharing batch, xmode and setup overrides use the same setup and can share one run
+    overrides = task_overrides(first_task)
+    group = [row for row in tasks
+             if len(row) >= 7 and row[6] == "PENDING" and row[3] == first_task[3] and row[5] == first_task[5]
+             and task_overrides(row) == overrides]
+    if lane:
+        # A stolen run takes only the other lane's tasks, and a home run only its own
+        first_home = lanes.task_lane(first_task)
+        group = [row for row in group if lanes.task_lane(row) == first_home]
+    return sorted(group, key=queue_store.task_priority, reverse=True)[:min(BATCH_MAX_TASKS, headroom(first_task[1]))]
+
+def process_pending_batch(debug=False, edf=False, lane=None, backend=None):
+    os.makedirs(LOG_DIR, exist_ok=True)
 
     with open(QUEUE_FILE, "r+", newline='') as f:
         fcntl.flock(f, fcntl.LOCK_EX)
         reader = list(csv.reader(f))
         header = reader[0]
         tasks = reader[1:]
-        for row in tasks:
-            if row[4] == stil_path and row[3] == batch_id:
-                row[6] = "COMPLETE" if success else "FAILED"
+        counters = queue_store.load_counters(f, tasks, QUEUE_FILE)
+        if reclaim_leases(tasks, counters, debug):
+            write_queue(f, header, tasks, counters)
+        headroom = dispatch_headroom(tasks, debug)
+        # A group that does not fit on disk is passed over for the next candidate group before giving up the cycle
+        deferred = set()
+        for _ in range(ADMISSION_CANDIDATES):
+            candidates = [row for row in tasks if id(row) not in deferred]
+            if lane:
+                first_task = select_for_lane(tasks, candidates, headroom, lane, edf, debug)
+            else:
+                first_task = select_any(tasks, candidates, headroom, edf, debug)
+            if not first_task:
                 break
-        f.seek(0)
-        writer = csv.writer(f)
-        writer.writerow(header)
-        writer.writerows(tasks)
-        f.truncate()
+            claimed = batch_group(candidates, first_task, headroom, lane)
+            admitted, shared_staging = admit_tasks([row[4] for row in claimed], first_task[3], debug, lane)
+            if admitted:
+                break
+            deferred.update(id(row) for row in claimed)
+            first_task = None
+        if not first_task:
+            if not deferred:
+                print(f"[INFO] No pending tasks, or all are held back by licenses, per-user quotas"
+                      f"{' or lane limits' if lane else ''}.")
+            fcntl.flock(f, fcntl.LOCK_UN)
+            return
+
+        batch_id, xmode, submitted_by, submitter_email = first_task[3], first_task[5], first_task[1], first_task[2]
+        overrides = task_overrides(first_task)
+        fence = queue_store.next_fence(tasks)
+        # Slurm placement follows the largest single input
+        run_lane = lane or ("slurm" if any(lanes.task_lane(row) == "slurm" for row in claimed) else "local")
+        for row in claimed:
+            row[6] = "RUNNING"
+            queue_store.grant_lease(row, WORKER_ID, fence, LEASE_SEC)
+            row[lanes.LANE_COLUMN] = run_lane
+        queue_store.count_transition(counters, batch_id, "PENDING", "RUNNING", len(claimed))
+        queue_store.record_dispatch(submitted_by, len(claimed), QUOTA_WINDOW_SEC, QUEUE_FILE)
+        if debug:
+            print(f"[DEBUG] Claimed {len(claimed)} task(s) from batch {batch_id} (xmode={xmode!r}, overrides={overrides})")
+
+        write_queue(f, header, tasks, counters)
         fcntl.flock(f, fcntl.LOCK_UN)
 
+    stil_paths = [row[4] for row in claimed]
+    task_keys = [queue_store.task_key(row) for row in claimed]
+    log_filename = log_store.new_log_path(batch_id, LOG_DIR)
+    project_name = project_for(batch_id, batch_id, overrides)
+    print(f"[EXECUTE] Running ategen on {len(stil_paths)} pattern(s) of batch {batch_id}")
+    heartbeat = start_heartbeat(fence, debug)
+    try:
+        setup_file, setup_hash, setup_error = prepare_setup(xmode, overrides, debug)
+        if setup_error:
+            success, output, start_time, end_time, duration = setup_failure(setup_error)
+            results = {path: "FAILED" for path in stil_paths}
+        else:
+            success, output, start_time, end_time, duration = run_stil_batch_command(stil_paths, batch_id, log_filename, xmode,
+                                                                                     debug, setup_file, shared_staging, task_keys,
+                                                                                     lane, project_name, overrides, fence,
+                                                                                     backend)
+            results = split_batch_results(stil_paths, os.path.join(task_workdir(batch_id), project_name), success, output,
+                                          debug)
+    finally:
+        heartbeat.set()
+
+    results, batch_counts, rows = finish_tasks(batch_id, overrides, results, fence)
+
+    metrics = run_metrics(stil_paths, output, log_filename, overrides, setup_hash, project_name, batch_id, success,
+                          executors.peak_rss_kb(run_state.job_name(batch_id, task_keys)))
     with open(log_filename, "a") as log:
         log.write(f"[{datetime.now()}] {'SUCCESS' if success else 'FAILED'}:\n{output}\n")
-    log_execution(start_time, end_time, batch_id, stil_path, duration, "COMPLETE" if success else "FAILED", debug)
-
-    with open(QUEUE_FILE, "r", newline='') as f:
-        fcntl.flock(f, fcntl.LOCK_SH)
-        reader = list(csv.reader(f))
-        tasks = reader[1:]
-        batch_tasks = [row for row in tasks if row[3] == batch_id]
-        fcntl.flock(f, fcntl.LOCK_UN)
+    log_store.finalize_task_log(batch_id, stil_paths, log_filename, debug)
+    # Log the amortized per-pattern cost so duration history stays comparable
+    per_task_duration = round(duration / len(stil_paths), 2)
+    # Peak RSS and OutputBytes are for the whole run and cannot be split per pattern
+    for path, status in results.items():
+        if status != "PENDING":
+            log_execution(start_time, end_time, batch_id, path, per_task_duration, status, debug, metrics[path])
+    if not overrides:
+        record_completed([path for path, status in results.items() if status == "COMPLETE"], xmode, batch_id)
 
-    if all(row[6] in ("COMPLETE", "FAILED") for row in batch_tasks):
-        summary = "\n".join([f"{row[4]}  -->  {row[6]}" for row in batch_tasks])
-        passed = sum(1 for row in batch_tasks if row[6] == "COMPLETE")
-        failed = sum(1 for row in batch_tasks if row[6] == "FAILED")
-        status_tag = "PASS" if failed == 0 else "FAIL"
-        subject = f"[{status_tag}] Pattern Release : {batch_id}"
-        body = f"Batch: {batch_id}\n\nSummary:\n{summary}\n\nResult: {passed} Passed, {failed} Failed"
-        send_email(sender_email, sender_password, submitter_email, subject, body, debug)
+    notify_batch(batch_id, batch_counts, rows, submitted_by, submitter_email,
+                 [path for path, status in results.items() if status == "FAILED"], debug)
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument("--debug", action="store_true", help="Enable debug logs")
+    parser.add_argument("--batch-mode", action="store_true",
+                        help="Convert all pending patterns of a batch (same xmode) in one ategen run")
+    parser.add_argument("--worker", action="store_true",
+                        help="Run as one of several workers (any host) sharing the queue through leases")
+    parser.add_argument("--lane", choices=lanes.LANES,
+                        help="Serve one execution lane, taking work from the other lane when it is congested; "
+                             "without --worker each lane has its own host lock, so one cycle per lane can run")
+    parser.add_argument("--executor", choices=sorted(executors.EXECUTORS),
+                        help="Run every task with this backend (e.g. simulated) instead of choosing by lane")
+    parser.add_argument("--edf", action="store_true",
+                        help="Serve batches with a deadline first, ordered to meet as many deadlines as possible")
     args = parser.parse_args()
 
-    try:
+    # Retry queued notifications even on cycles that do not dispatch anything
+    notify.start_sender(args.debug)
+
+    def run_cycle():
+        try:
+            if args.batch_mode:
+                process_pending_batch(args.debug, args.edf, args.lane, args.executor)
+            else:
+                process_first_pending_task(args.debug, args.edf, args.lane, args.executor)
+        except Exception as e:
+            print(f"[ERROR] Task execution failed: {e}")
+
+    if not (args.worker or args.lane):
+        # Single-host mode counts the user's ategen jobs in squeue; lane and worker mode account for
+        # licenses from the queue's RUNNING rows when they select a task
         skip_if_too_many_jobs(args.debug)
-        with open(LOCK_FILE, "x") as lockfile:
-            try:
-                process_first_pending_task(args.debug)
-            except Exception as e:
-                print(f"[ERROR] Task execution failed: {e}")
-            finally:
-                os.remove(LOCK_FILE)
-    except FileExistsError:
-        print("[INFO] Another instance is running.")
+    if args.worker:
+        # Workers on any host coordinate through leases on the queue rows instead of the host lock
+        run_cycle()
+    else:
+        # --lane without --worker keeps one instance per lane and host: each lane has its own lock file
+        lock_file = lane_lock_file(args.lane)
+        try:
+            with open(lock_file, "x") as lockfile:
+                try:
+                    run_cycle()
+                finally:
+                    os.remove(lock_file)
+        except FileExistsError:
+            print("[INFO] Another instance is running.")
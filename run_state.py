@@ -0,0 +1,77 @@
+import glob
+import hashlib
+import json
+import os
+import signal
+import socket
+import subprocess
+from datetime import datetime
+from config import BASE_DIR
+
+RUN_STATE_DIR = os.path.join(BASE_DIR, "run_state")
+
+def job_name(batch_id, task_keys):
+    # Slurm job name of a run, so it can be found again by `scancel --name`
+    digest = hashlib.sha1("|".join(sorted(task_keys)).encode()).hexdigest()[:8]
+    return f"ategen_{batch_id}_{digest}"
+
+def state_file(name):
+    return os.path.join(RUN_STATE_DIR, f"{name}.json")
+
+def record_run(name, pid, batch_id, task_keys, slurm, debug=False):
+    # pid is also the process group id: ategen runs in its own session
+    os.makedirs(RUN_STATE_DIR, exist_ok=True)
+    state = {
+        "job_name": name,
+        "pid": pid,
+        "host": socket.gethostname(),
+        "slurm": slurm,
+        "batch_id": batch_id,
+        "tasks": list(task_keys),
+        "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    path = state_file(name)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+    if debug:
+        print(f"[DEBUG] Recorded run {name} (pid {pid}, slurm={slurm})")
+
+def clear_run(name):
+    try:
+        os.remove(state_file(name))
+    except FileNotFoundError:
+        pass
+
+def active_runs():
+    runs = []
+    for path in glob.glob(os.path.join(RUN_STATE_DIR, "*.json")):
+        try:
+            with open(path) as f:
+                runs.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return runs
+
+def kill_run(state, debug=False):
+    killed = False
+    if state["host"] == socket.gethostname():
+        try:
+            os.killpg(state["pid"], signal.SIGTERM)
+            killed = True
+        except ProcessLookupError:
+            pass
+        except PermissionError as e:
+            print(f"[WARN] Cannot signal run {state['job_name']} (pid {state['pid']}): {e}")
+    else:
+        print(f"[WARN] Run {state['job_name']} was started on {state['host']}; its local process is left alone")
+    if state["slurm"]:
+        result = subprocess.run(["scancel", "--name", state["job_name"]], stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, universal_newlines=True)
+        if result.returncode != 0:
+            print(f"[WARN] scancel --name {state['job_name']} failed: {result.stdout.strip()}")
+        else:
+            killed = True
+    if debug:
+        print(f"[DEBUG] Cancelled run {state['job_name']} (killed={killed})")
+    return killed
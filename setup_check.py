@@ -0,0 +1,176 @@
+import ast
+import difflib
+import hashlib
+import json
+import os
+import sys
+import setup_profiles
+
+VALIDATION_CACHE_NAME = "validation_cache.json"  # kept next to the rendered setup artifacts
+
+# Enumerations documented in the ATEGen template comments
+ENUMS = {
+    "input_file_type": ["", "STIL", "WGL", "TDL", "SVF", "AIF"],
+    "smt8_tester_model": ["PS1600", "PS9G", "PS5000", "PSMLS"],
+    "stil_reader_mode": ["one_pass", "two_pass"],
+    "smt8_spec_layout": ["default", "flat", "modular"],
+}
+# Keys whose template default is None but which take a value when enabled
+OPTIONAL_KEYS = {"smt8_combinations_file", "smt8_adjust_comments", "smt8_repeat_break",
+                 "smt8_use_channel_mapping", "smt8_use_model_file"}
+SPECIAL_VALUES = {"smt8_xmode_factor": ["auto"]}
+
+_memory_cache = {}
+_schema_cache = {}
+
+def load_setup_source(source):
+    # Parse without executing: only top-level `key = <literal>` statements are allowed
+    values, errors = {}, []
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return values, [f"line {e.lineno}: syntax error: {e.msg}"]
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            key = node.targets[0].id
+            try:
+                values[key] = ast.literal_eval(node.value)
+            except ValueError:
+                errors.append(f"line {node.lineno}: {key} is not a literal value")
+        else:
+            errors.append(f"line {node.lineno}: unsupported statement ({type(node).__name__})")
+    return values, errors
+
+def load_setup(path):
+    with open(path) as f:
+        return load_setup_source(f.read())
+
+def template_schema(template=None):
+    template = template or setup_profiles.BASE_TEMPLATE
+    with open(template, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    if digest not in _schema_cache:
+        values, _ = load_setup_source(content.decode())
+        _schema_cache[digest] = values
+    return digest, _schema_cache[digest]
+
+def check_value(key, value, default):
+    if key in ENUMS:
+        if value not in ENUMS[key]:
+            return f"{key} = {value!r}: must be one of {ENUMS[key]}"
+        return None
+    if value in SPECIAL_VALUES.get(key, []):
+        return None
+    if value is None:
+        return None if default is None or key in OPTIONAL_KEYS else f"{key} = None: a value is required"
+    if default is None:
+        return None if isinstance(value, str) else f"{key} = {value!r}: expected a string or None"
+    expected = type(default)
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        return None
+    if not isinstance(value, expected) or isinstance(value, bool) != isinstance(default, bool):
+        return f"{key} = {value!r}: expected {expected.__name__}, got {type(value).__name__}"
+    return None
+
+def validate_values(values, schema):
+    problems = []
+    for key, value in values.items():
+        if key not in schema:
+            hint = difflib.get_close_matches(key, schema, n=1)
+            problems.append(f"unknown key {key}" + (f" (did you mean {hint[0]}?)" if hint else ""))
+            continue
+        problem = check_value(key, value, schema[key])
+        if problem:
+            problems.append(problem)
+    return problems
+
+def validation_cache_file():
+    return os.path.join(setup_profiles.SETUP_CACHE_DIR, VALIDATION_CACHE_NAME)
+
+def _load_cache():
+    try:
+        with open(validation_cache_file()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _store_cache(cache):
+    path = validation_cache_file()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, sort_keys=True)
+    os.replace(tmp, path)
+
+def validate_setup(path, template=None, debug=False):
+    with open(path, "rb") as f:
+        content = f.read()
+    schema_digest, schema = template_schema(template)
+    key = f"{hashlib.sha256(content).hexdigest()[:16]}:{schema_digest}"
+    if key in _memory_cache:
+        return _memory_cache[key]
+
+    cache = _load_cache()
+    if key in cache:
+        if debug:
+            print(f"[DEBUG] Setup validation cache hit for {path}")
+        _memory_cache[key] = cache[key]
+        return cache[key]
+
+    values, problems = load_setup_source(content.decode())
+    problems += validate_values(values, schema)
+    if debug:
+        print(f"[DEBUG] Validated {path}: {len(problems)} problem(s)")
+    cache[key] = problems
+    _store_cache(cache)
+    _memory_cache[key] = problems
+    return problems
+
+def diff_setups(path_a, path_b):
+    # Semantic diff: compares parsed values, ignoring comments and formatting
+    values_a, _ = load_setup(path_a)
+    values_b, _ = load_setup(path_b)
+    missing = object()
+    changes = []
+    for key in sorted(set(values_a) | set(values_b)):
+        a, b = values_a.get(key, missing), values_b.get(key, missing)
+        if a != b:
+            changes.append((key, "<unset>" if a is missing else a, "<unset>" if b is missing else b))
+    return changes
+
+def resolve_target(name):
+    # Accept either a setup file path or a profile name
+    if name in setup_profiles.PROFILES and not os.path.exists(name):
+        return setup_profiles.materialize_setup(name)
+    return name
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Validate and diff ATEGen setup files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    validate = sub.add_parser("validate", help="Check setup files or profiles against the template")
+    validate.add_argument("targets", nargs="+")
+    diff = sub.add_parser("diff", help="Show semantic differences between two setups or profiles")
+    diff.add_argument("a")
+    diff.add_argument("b")
+    parser.add_argument("--debug", action="store_true", help="Enable debug logs")
+    args = parser.parse_args()
+
+    if args.command == "validate":
+        failed = False
+        for target in args.targets:
+            problems = validate_setup(resolve_target(target), debug=args.debug)
+            if problems:
+                failed = True
+                print(f"[ERROR] {target}: {len(problems)} problem(s)")
+                for problem in problems:
+                    print(f"  {problem}")
+            else:
+                print(f"[INFO] {target}: OK")
+        sys.exit(1 if failed else 0)
+    else:
+        changes = diff_setups(resolve_target(args.a), resolve_target(args.b))
+        for key, a, b in changes:
+            print(f"{key}: {a!r} -> {b!r}")
+        print(f"[INFO] {len(changes)} difference(s)")
@@ -0,0 +1,146 @@
+import ast
+import hashlib
+import json
+import os
+from config import BASE_DIR
+
+# === CONFIGURATION ===
+BASE_TEMPLATE = os.path.join(BASE_DIR, "normal.py")  # ATEGen setup template, untouched
+SETUP_CACHE_DIR = os.path.join(BASE_DIR, "setup_cache")
+# Operator-maintained x4 setup; its differences from smt8p7 are not encoded as overrides yet,
+# so the file itself is the template of smt8p7_x4
+SETUP_X4_FILE = os.path.join(BASE_DIR, "smt8p7_setupx4.py")
+
+# Each profile is the template plus its parents' overrides plus its own. A profile with its
+# own "template" starts from that file instead of BASE_TEMPLATE.
+# smt8p7 replaced the hand-written smt8p7_setup.py, which is kept only in git history; audit with
+#   git show 07a782a:smt8p7_setup.py > /tmp/smt8p7_setup.py && python setup_check.py diff smt8p7 /tmp/smt8p7_setup.py
+PROFILES = {
+    "base": {"parent": None, "overrides": {}},
+    "smt8p7": {
+        "parent": "base",
+        "overrides": {
+            "smt8_smartest_version": "8.7.0",
+            "smt8_tester_model": "PS5000",
+            "smt8_optimize_timingsets": 1,
+            "smt8_cycle_numbering_start_cycle": 1,
+            "smt8_vector_memory_summary": 1,  # parsed by output_report for vector memory accounting
+        },
+    },
+    "smt8p7_x4": {
+        "parent": None,
+        "template": SETUP_X4_FILE,
+        "overrides": {},
+    },
+}
+XMODE_PROFILES = {"": "smt8p7", "4": "smt8p7_x4"}
+
+_render_cache = {}
+
+def resolve_profile(name):
+    if name not in PROFILES:
+        raise KeyError(f"Unknown setup profile: {name}. Must be one of {sorted(PROFILES)}")
+    chain = []
+    while name is not None:
+        if name in chain:
+            raise ValueError(f"Setup profile inheritance loop at: {name}")
+        chain.append(name)
+        name = PROFILES[name]["parent"]
+    merged = {}
+    for layer in reversed(chain):
+        merged.update(PROFILES[layer]["overrides"])
+    return merged
+
+def profile_template(name):
+    while name is not None:
+        if PROFILES[name].get("template"):
+            return PROFILES[name]["template"]
+        name = PROFILES[name]["parent"]
+    return BASE_TEMPLATE
+
+def template_assignments(source):
+    # Top-level `key = value` statements of a setup file as {key: (first_line, last_line)}, 1-based
+    spans = {}
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            spans[node.targets[0].id] = (node.lineno, node.end_lineno)
+    return spans
+
+def render_setup(overrides, template=None):
+    with open(template or BASE_TEMPLATE) as f:
+        source = f.read()
+    lines = source.splitlines()
+    spans = template_assignments(source)
+
+    # Replace bottom-up so earlier line numbers stay valid
+    for key in sorted((k for k in overrides if k in spans), key=lambda k: spans[k][0], reverse=True):
+        first, last = spans[key]
+        lines[first - 1:last] = [f"{key} = {overrides[key]!r}"]
+
+    extra = sorted(k for k in overrides if k not in spans)
+    if extra:
+        lines.append("")
+        lines.append("# --- settings not present in the template ---")
+        for key in extra:
+            lines.append(f"{key} = {overrides[key]!r}")
+    return "\n".join(lines) + "\n"
+
+def content_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+def setup_hash_of(setup_file):
+    # Artifacts are named <profile>_<hash>.py; fall back to hashing the file contents
+    stem = os.path.splitext(os.path.basename(setup_file))[0]
+    if os.path.dirname(os.path.abspath(setup_file)) == os.path.abspath(SETUP_CACHE_DIR) and "_" in stem:
+        return stem.rsplit("_", 1)[1]
+    with open(setup_file) as f:
+        return content_hash(f.read())
+
+def materialize_setup(profile, extra_overrides=None, template=None, debug=False, cache_dir=None):
+    # cache_dir renders run-specific setups (e.g. naming files in a staging dir) outside SETUP_CACHE_DIR
+    overrides = resolve_profile(profile)
+    template = template or profile_template(profile)
+    if not os.path.exists(template):
+        raise FileNotFoundError(f"Setup template {template} of profile {profile} is missing; "
+                                f"tasks using this profile cannot run until it is restored")
+    overrides.update(extra_overrides or {})
+
+    stat = os.stat(template)
+    cache_dir = cache_dir or SETUP_CACHE_DIR
+    key = (profile, template, cache_dir, stat.st_mtime_ns, stat.st_size, json.dumps(overrides, sort_keys=True, default=repr))
+    if key in _render_cache and os.path.exists(_render_cache[key]):
+        return _render_cache[key]
+
+    text = render_setup(overrides, template)
+    path = os.path.join(cache_dir, f"{profile}_{content_hash(text)}.py")
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+        if debug:
+            print(f"[DEBUG] Rendered setup profile {profile} -> {path}")
+    elif debug:
+        print(f"[DEBUG] Reusing cached setup artifact {path}")
+    _render_cache[key] = path
+    return path
+
+def setup_for_xmode(xmode, extra_overrides=None, debug=False, cache_dir=None):
+    return materialize_setup(XMODE_PROFILES[xmode], extra_overrides, debug=debug, cache_dir=cache_dir)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Render ATEGen setup files from profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List profiles and their resolved overrides")
+    render = sub.add_parser("render", help="Render a profile and print the artifact path")
+    render.add_argument("profile")
+    render.add_argument("--debug", action="store_true", help="Enable debug logs")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for name in PROFILES:
+            print(f"{name}: {json.dumps(resolve_profile(name), sort_keys=True)}")
+    else:
+        print(materialize_setup(args.profile, debug=args.debug))
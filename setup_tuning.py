@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+import log_store
+from config import BASE_DIR, EXECUTION_LOG_FILE
+
+EXPERIMENT_DIR = os.path.join(BASE_DIR, "experiments")  # tuning outputs never land in the release area
+TUNING_BATCH_PREFIX = "tune_"
+
+# Setup knobs compared by an experiment; every variant also asks ATEGen for its vector memory summary
+TUNING_VARIANTS = [
+    {"stil_reader_mode": "one_pass", "smt8_repeat_compression": 0},
+    {"stil_reader_mode": "one_pass", "smt8_repeat_compression": 1},
+    {"stil_reader_mode": "two_pass", "smt8_repeat_compression": 0},
+    {"stil_reader_mode": "two_pass", "smt8_repeat_compression": 1},
+]
+TUNED_KEYS = sorted({key for variant in TUNING_VARIANTS for key in variant})
+SIZE_BUCKETS_MB = [20, 200, 1000]
+
+def is_experiment_batch(batch_id):
+    return batch_id.startswith(TUNING_BATCH_PREFIX)
+
+def experiment_variants(overrides):
+    # Task overrides are kept; the tuned knobs are replaced by each variant in turn
+    return [{**overrides, **variant, "smt8_vector_memory_summary": 1} for variant in TUNING_VARIANTS]
+
+def size_bucket(size_bytes):
+    size_mb = size_bytes / 1024 / 1024
+    lower = 0
+    for upper in SIZE_BUCKETS_MB:
+        if size_mb < upper:
+            return f"{lower}-{upper}MB"
+        lower = upper
+    return f">={lower}MB"
+
+def pattern_class(stil_path, size_bytes):
+    # e.g. ..._int_sa_chain_edt_pl_061025_1.stil.gz -> sa_chain_edt_pl
+    name = os.path.basename(stil_path)
+    match = re.search(r"_int_(.+?)_\d{6}", name)
+    kind = match.group(1) if match else "other"
+    return f"{kind}/{size_bucket(size_bytes)}"
+
+def variant_key(overrides):
+    return json.dumps({key: overrides.get(key) for key in TUNED_KEYS}, sort_keys=True)
+
+def variant_tag(overrides):
+    # Short stable name of a variant, so its outputs and manifest stay apart from the other variants'
+    return "v" + hashlib.sha1(variant_key(overrides).encode()).hexdigest()[:8]
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+def collect_samples(log_file=None):
+    samples = defaultdict(lambda: defaultdict(list))
+    for row in log_store.iter_execution_log(log_file or EXECUTION_LOG_FILE):
+        if row.get("Status") != "COMPLETE" or not is_experiment_batch(row.get("BatchID", "")):
+            continue
+        overrides = json.loads(row.get("Overrides") or "{}")
+        size = int(row.get("InputBytes") or 0)
+        samples[pattern_class(row["STIL_Path"], size)][variant_key(overrides)].append(row)
+    return samples
+
+def recommend(log_file=None, min_samples=1):
+    # Score each variant by runtime and vector memory relative to the best seen in its class
+    recommendations = {}
+    for cls, variants in collect_samples(log_file).items():
+        stats = {}
+        for key, rows in variants.items():
+            if len(rows) < min_samples:
+                continue
+            vector_memory = [float(r["VectorMemory"]) for r in rows if r.get("VectorMemory")]
+            stats[key] = {
+                "samples": len(rows),
+                "duration": _mean([float(r["Duration_sec"]) for r in rows]),
+                "vector_memory": _mean(vector_memory),
+                "peak_rss_kb": _mean([float(r["PeakRSS_KB"]) for r in rows if r.get("PeakRSS_KB")]),
+            }
+        if not stats:
+            continue
+        best_duration = min(s["duration"] for s in stats.values()) or 1.0
+        memories = [s["vector_memory"] for s in stats.values() if s["vector_memory"]]
+        best_memory = min(memories) if memories else None
+        for s in stats.values():
+            s["score"] = s["duration"] / best_duration
+            if best_memory and s["vector_memory"]:
+                s["score"] += s["vector_memory"] / best_memory
+        best = min(stats, key=lambda k: stats[k]["score"])
+        recommendations[cls] = {"settings": json.loads(best), "stats": stats}
+    return recommendations
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Recommend setup knobs from tuning experiments")
+    parser.add_argument("--log", help="Execution log to read", default=None)
+    parser.add_argument("--min-samples", type=int, default=1, help="Ignore variants with fewer runs")
+    args = parser.parse_args()
+
+    results = recommend(args.log, args.min_samples)
+    if not results:
+        print("[INFO] No completed tuning runs found.")
+    for cls, result in sorted(results.items()):
+        print(f"{cls}: recommend {json.dumps(result['settings'], sort_keys=True)}")
+        for key, s in sorted(result["stats"].items(), key=lambda item: item[1]["score"]):
+            memory = f"{s['vector_memory']:.0f}" if s["vector_memory"] is not None else "n/a"
+            rss = f"{s['peak_rss_kb']:.0f}KB" if s["peak_rss_kb"] is not None else "n/a"
+            print(f"    {key}  runs={s['samples']} time={s['duration']:.1f}s vecmem={memory} rss={rss} score={s['score']:.2f}")
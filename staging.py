@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+from config import LOCAL_SUFFIX, OUTPUT_DIR
+
+LOCAL_SCRATCH_DIR = f"/tmp/stil_staging{LOCAL_SUFFIX}"  # local disk on the scheduler host
+SHARED_STAGING_DIR = os.path.join(OUTPUT_DIR, ".staging")  # visible to Slurm nodes, same filesystem as OUTPUT_DIR
+KEEP_FAILED_STAGING = False
+
+def create_staging_dir(tag, shared=False, debug=False):
+    root = SHARED_STAGING_DIR if shared else LOCAL_SCRATCH_DIR
+    os.makedirs(root, exist_ok=True)
+    path = tempfile.mkdtemp(prefix=f"{tag}_", dir=root)
+    if debug:
+        print(f"[DEBUG] Created staging dir {path}")
+    return path
+
+def same_filesystem(path_a, path_b):
+    return os.stat(path_a).st_dev == os.stat(path_b).st_dev
+
+def _stage_file(src, dest, rename):
+    if rename:
+        return src, dest
+    # Cross-filesystem: copy next to the destination now, rename over it at publish time
+    tmp = os.path.join(os.path.dirname(dest), f".{os.path.basename(dest)}.publish-{os.getpid()}")
+    shutil.copy2(src, tmp)
+    return tmp, dest
+
+def prepare_publish(staging_dir, dest_root, debug=False):
+    # The slow part of publishing, done before the caller takes any lock: directories are created
+    # and cross-filesystem copies land next to their destination. Returns the (src, dest) renames
+    # that commit_publish applies; a top-level entry that does not exist yet in dest_root is moved
+    # as a whole when both sides share a filesystem.
+    os.makedirs(dest_root, exist_ok=True)
+    rename = same_filesystem(staging_dir, dest_root)
+    moves = []
+    for entry in sorted(os.listdir(staging_dir)):
+        src_top = os.path.join(staging_dir, entry)
+        dest_top = os.path.join(dest_root, entry)
+        if rename and not os.path.lexists(dest_top):
+            moves.append((src_top, dest_top))
+            continue
+        if not os.path.isdir(src_top):
+            moves.append(_stage_file(src_top, dest_top, rename))
+            continue
+        for dirpath, _, files in os.walk(src_top):
+            target_dir = os.path.join(dest_root, os.path.relpath(dirpath, staging_dir))
+            os.makedirs(target_dir, exist_ok=True)
+            for name in sorted(files):
+                moves.append(_stage_file(os.path.join(dirpath, name), os.path.join(target_dir, name), rename))
+    return moves
+
+def _merge_tree(src_dir, dest_dir):
+    count = 0
+    for dirpath, _, files in os.walk(src_dir):
+        target_dir = os.path.join(dest_dir, os.path.relpath(dirpath, src_dir))
+        os.makedirs(target_dir, exist_ok=True)
+        for name in files:
+            os.replace(os.path.join(dirpath, name), os.path.join(target_dir, name))
+            count += 1
+    return count
+
+def commit_publish(moves, staging_dir, dest_root, debug=False):
+    # Files become visible one atomic rename at a time
+    published = 0
+    for src, dest in moves:
+        if os.path.isdir(src) and os.path.lexists(dest):
+            # Another run of the batch created it after prepare_publish; same filesystem, so merge by renames
+            published += _merge_tree(src, dest)
+            continue
+        os.replace(src, dest)
+        published += 1
+    if debug:
+        print(f"[DEBUG] Published {published} entr{'y' if published == 1 else 'ies'} from {staging_dir} to {dest_root}")
+    return published
+
+def abort_publish(moves, staging_dir):
+    # Removes copies prepared next to their destinations; sources inside staging_dir go with it
+    for src, _ in moves:
+        if not src.startswith(staging_dir + os.sep):
+            try:
+                os.remove(src)
+            except OSError:
+                pass
+
+def discard_staging(staging_dir, failed=False, debug=False):
+    if failed and KEEP_FAILED_STAGING:
+        print(f"[INFO] Keeping failed staging dir {staging_dir}")
+        return
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    if debug:
+        print(f"[DEBUG] Removed staging dir {staging_dir}")
@@ -0,0 +1,198 @@
+import fnmatch
+import json
+import os
+import time
+from datetime import datetime
+import config
+import stilsubmit
+from config import BASE_DIR
+from queue_store import QUEUE_FILE
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # optional; falls back to polling
+    INotify = None
+
+INGEST_STATE_FILE = os.path.join(BASE_DIR, "ingest_state.json")
+POLL_SEC = 30
+SETTLE_SEC = 120  # size and mtime must hold this long before a file is taken
+GZIP_MAGIC = b"\x1f\x8b"
+
+# repack_config.json may carry an "ingest" section:
+#   {"dirs": ["/projects/ga0/patterns/scan/drop"], "glob": "*.stil.gz", "xmode": "",
+#    "settle_sec": 120, "poll_sec": 30, "user": "patgen"}
+
+def is_gzip(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(2) == GZIP_MAGIC
+    except OSError:
+        return False
+
+class IngestWatcher:
+    def __init__(self, dirs, pattern=stilsubmit.DEFAULT_GLOB, xmode="", settle_sec=SETTLE_SEC, user=None,
+                 state_file=None, queue_file=None, debug=False):
+        self.roots = [os.path.abspath(d) for d in dirs]
+        self.pattern = pattern
+        self.xmode = xmode
+        self.settle_sec = settle_sec
+        self.user = user
+        self.state_file = state_file or INGEST_STATE_FILE
+        self.queue_file = queue_file or QUEUE_FILE
+        self.debug = debug
+        self.dir_mtimes = {}  # directory -> mtime_ns at its last listing
+        self.candidates = {}  # path -> (size, mtime_ns, unchanged since)
+        self.ingested = self._load_state()  # path -> [size, mtime_ns] already queued
+        self.inotify = INotify() if INotify is not None else None
+        self.watches = {}
+        self.dirty = set(self.roots)
+
+    def _load_state(self):
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _store_state(self):
+        tmp = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.ingested, f)
+        os.replace(tmp, self.state_file)
+
+    def _watch(self, path):
+        if self.inotify is not None and path not in self.watches.values():
+            mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE_SELF
+            try:
+                self.watches[self.inotify.add_watch(path, mask)] = path
+            except OSError as e:
+                print(f"[WARN] Cannot watch {path}: {e}")
+
+    def list_dir(self, path):
+        try:
+            self.dir_mtimes[path] = os.stat(path).st_mtime_ns
+            self._watch(path)
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path not in self.dir_mtimes:
+                            self.dirty.add(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and fnmatch.fnmatch(entry.name, self.pattern):
+                        st = entry.stat(follow_symlinks=False)
+                        if self.ingested.get(entry.path) != [st.st_size, st.st_mtime_ns]:
+                            self.candidates.setdefault(entry.path, (st.st_size, st.st_mtime_ns, time.time()))
+        except FileNotFoundError:
+            self.dir_mtimes.pop(path, None)
+        except OSError as e:
+            print(f"[WARN] Cannot scan {path}: {e}")
+
+    def wait_for_changes(self, timeout):
+        # Marks directories whose listing may have changed
+        if self.inotify is not None:
+            for event in self.inotify.read(timeout=int(timeout * 1000)):
+                if event.wd in self.watches:
+                    self.dirty.add(self.watches[event.wd])
+                if event.mask & flags.IGNORED:
+                    self.watches.pop(event.wd, None)
+            return
+        time.sleep(timeout)
+        # Polling: a directory's mtime changes whenever an entry is added, renamed or removed
+        for path, mtime_ns in list(self.dir_mtimes.items()):
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    self.dirty.add(path)
+            except FileNotFoundError:
+                self.dir_mtimes.pop(path, None)
+
+    def settled(self):
+        # Only candidates are stat'ed; a file counts as written once it stops changing
+        ready = []
+        now = time.time()
+        for path, (size, mtime_ns, since) in list(self.candidates.items()):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                del self.candidates[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self.candidates[path] = (st.st_size, st.st_mtime_ns, now)
+            elif now - since >= self.settle_sec:
+                ready.append(path)
+        return ready
+
+    def root_of(self, path):
+        return next((root for root in self.roots if path.startswith(root + os.sep)), self.roots[0])
+
+    def enqueue(self, ready):
+        by_root = {}
+        for path in ready:
+            size, mtime_ns, _ = self.candidates.pop(path)
+            error = stilsubmit.check_stil_path(path)
+            if not error and path.endswith(".gz") and not is_gzip(path):
+                error = f"{path} is not a gzip file"
+            # Recorded either way so a bad file is reported once, not on every cycle
+            self.ingested[path] = [size, mtime_ns]
+            if error:
+                print(f"[WARN] Not ingesting: {error}")
+                continue
+            by_root.setdefault(self.root_of(path), []).append(path)
+        for root, paths in by_root.items():
+            name = f"ingest_{os.path.basename(root)}"
+            batch_id, added = stilsubmit.submit_batch(sorted(paths), self.xmode, name, queue_file=self.queue_file,
+                                                      user=self.user, debug=self.debug)
+            if batch_id:
+                print(f"[INFO] {datetime.now()} ingested {added} file(s) from {root} as {batch_id}")
+            else:
+                for path in paths:
+                    self.ingested.pop(path, None)  # retried next cycle
+        if ready:
+            self._store_state()
+
+    def run_once(self):
+        while self.dirty:
+            self.list_dir(self.dirty.pop())
+        self.enqueue(self.settled())
+
+    def run_aged(self):
+        # One-shot (cron) mode: nothing is observed over time, so a file's age stands in for stability
+        while self.dirty:
+            self.list_dir(self.dirty.pop())
+        cutoff_ns = (time.time() - self.settle_sec) * 1e9
+        self.enqueue([path for path, (_, mtime_ns, _) in list(self.candidates.items()) if mtime_ns <= cutoff_ns])
+
+    def run(self, poll_sec=POLL_SEC):
+        print(f"[INFO] Watching {', '.join(self.roots)} for {self.pattern} "
+              f"({'inotify' if self.inotify is not None else 'polling'}, settle {self.settle_sec}s)")
+        while True:
+            self.run_once()
+            # Pending candidates need re-checking even when no directory changed
+            self.wait_for_changes(min(poll_sec, self.settle_sec) if self.candidates else poll_sec)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Queue STIL files as they appear in watched directories")
+    parser.add_argument("--dir", action="append", default=[], help="Directory to watch (repeatable; default from config)")
+    parser.add_argument("--glob", help=f"File name pattern (default {stilsubmit.DEFAULT_GLOB})")
+    parser.add_argument("--xmode", help="xmode for ingested files")
+    parser.add_argument("--settle", type=int, help=f"Seconds a file must stay unchanged (default {SETTLE_SEC})")
+    parser.add_argument("--poll", type=int, help=f"Polling interval in seconds (default {POLL_SEC})")
+    parser.add_argument("--once", action="store_true", help="Scan once and exit (for cron)")
+    parser.add_argument("--debug", action="store_true", help="Enable debug logs")
+    args = parser.parse_args()
+
+    ingest_config = config.load_config().get("ingest", {})
+    dirs = args.dir or ingest_config.get("dirs", [])
+    if not dirs:
+        parser.error("no directories to watch; use --dir or the ingest section of the config")
+    watcher = IngestWatcher(
+        dirs,
+        args.glob or ingest_config.get("glob", stilsubmit.DEFAULT_GLOB),
+        args.xmode if args.xmode is not None else ingest_config.get("xmode", ""),
+        args.settle if args.settle is not None else ingest_config.get("settle_sec", SETTLE_SEC),
+        ingest_config.get("user"),
+        debug=args.debug,
+    )
+    if args.once:
+        watcher.run_aged()
+    else:
+        watcher.run(args.poll or ingest_config.get("poll_sec", POLL_SEC))
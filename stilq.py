@@ -0,0 +1,206 @@
+import os
+import statistics
+import sys
+from datetime import datetime, timedelta
+import log_store
+import queue_store
+import run_state
+from config import EXECUTION_LOG_FILE, MAX_LICENSE
+from queue_store import QUEUE_FILE
+
+DURATION_SAMPLE_BYTES = 1024 * 1024  # recent execution history used for ETA
+DEFAULT_TASK_DURATION = 600  # seconds, when there is no history yet
+COUNTER_COLUMNS = ["total", "pending", "running", "paused", "complete", "failed", "cancelled"]
+ACTIVE_STATUSES = ("PENDING", "PAUSED", "RUNNING")
+
+def batch_status_line(batch_id, counts):
+    return f"{batch_id:<40}" + "".join(f"{counts.get(key, 0):>10}" for key in COUNTER_COLUMNS)
+
+def show_status(show_all=False, queue_file=None):
+    batches = queue_store.read_counters(queue_file or QUEUE_FILE)
+    print(f"{'BatchID':<40}" + "".join(f"{key.upper():>10}" for key in COUNTER_COLUMNS))
+    totals = {}
+    for batch_id, counts in batches.items():
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+        if show_all or not queue_store.batch_finished(counts):
+            print(batch_status_line(batch_id, counts))
+    print(batch_status_line(f"(all {len(batches)} batches)", totals))
+
+def list_tasks(user=None, batch_id=None, status=None, limit=None, queue_file=None):
+    # The most selective filter doubles as the line prefilter of the snapshot
+    needle = batch_id or user or (status.upper() if status else None)
+    _, rows = queue_store.read_snapshot(queue_file or QUEUE_FILE, needle)
+    rows = [row for row in rows
+            if (user is None or row[1] == user) and (batch_id is None or row[3] == batch_id)
+            and (status is None or row[6] == status.upper())]
+    if limit:
+        rows = rows[-limit:]
+    for row in rows:
+        overrides = row[7] if len(row) > 7 else ""
+        priority = queue_store.task_priority(row)
+        print(f"{row[0]}  {row[1]:<12} {row[3]:<30} {row[6]:<9} x{row[5] or '-'}  {row[4]}"
+              + (f"  {overrides}" if overrides else "") + (f"  p{priority}" if priority else "")
+              + (f"  due {row[9]}" if len(row) > 9 and row[9] else ""))
+    return rows
+
+def matching_tasks(batch_id, task, queue_file=None):
+    _, rows = queue_store.read_snapshot(queue_file or QUEUE_FILE, batch_id)
+    return [row for row in rows if task_matches(row, batch_id, task)]
+
+def show_task(batch_id, task, queue_file=None):
+    rows = matching_tasks(batch_id, task, queue_file)
+    if not rows:
+        print(f"[ERROR] No task matching '{task}' in batch {batch_id}")
+        return False
+    for row in rows:
+        print(f"STIL_Path:   {row[4]}\nBatchID:     {row[3]}\nStatus:      {row[6]}\nSubmitted:   {row[0]} by {row[1]} <{row[2]}>\n"
+              f"XMode:       {row[5] or '-'}\nOverrides:   {queue_store.task_overrides(row) or '-'}")
+        for path in log_store.find_logs(batch_id, row[4]):
+            print(f"Log:         {path}")
+        print()
+    return True
+
+def typical_duration(log_file=None):
+    log_file = log_file or EXECUTION_LOG_FILE
+    durations = []
+    for row in log_store.recent_execution_rows(log_file, DURATION_SAMPLE_BYTES):
+        try:
+            if row.get("Status") == "COMPLETE":
+                durations.append(float(row["Duration_sec"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return statistics.median(durations) if durations else DEFAULT_TASK_DURATION
+
+def show_eta(batch_id=None, queue_file=None, log_file=None):
+    # Batches are served in queue order, so a batch finishes after all work queued ahead of it
+    # (priority bumps are not accounted for)
+    batches = queue_store.read_counters(queue_file or QUEUE_FILE)
+    per_task = typical_duration(log_file)
+    ahead = 0
+    now = datetime.now()
+    for bid, counts in batches.items():
+        remaining = counts.get("pending", 0) + counts.get("running", 0)
+        if not remaining:
+            continue
+        ahead += remaining
+        if batch_id in (None, bid):
+            eta = timedelta(seconds=int(ahead * per_task / MAX_LICENSE))
+            print(f"{bid:<40} {remaining:>6} left  ETA {now + eta:%Y-%m-%d %H:%M} (in {eta})")
+    print(f"[INFO] {ahead} task(s) queued, ~{per_task:.0f}s per task, {MAX_LICENSE} license(s)")
+
+def task_matches(row, batch_id, task=None):
+    return row[3] == batch_id and (task is None or task == row[4] or task in os.path.basename(row[4]))
+
+def cancel_tasks(batch_id, task=None, queue_file=None, debug=False):
+    def cancel(row):
+        if task_matches(row, batch_id, task) and row[6] in ACTIVE_STATUSES:
+            row[6] = "CANCELLED"
+            return True
+        return False
+
+    cancelled = queue_store.modify_tasks(cancel, queue_file or QUEUE_FILE)
+    running = {queue_store.task_key(row) for row in cancelled if row[6] == "RUNNING"}
+    if running:
+        # A multi-pattern run is stopped only when every task in it was cancelled;
+        # otherwise it finishes and the cancelled tasks' results are discarded
+        _, rows = queue_store.read_snapshot(queue_file or QUEUE_FILE, batch_id)
+        still_running = {queue_store.task_key(row) for row in rows if row[6] == "RUNNING"}
+        for state in run_state.active_runs():
+            if running & set(state["tasks"]) and not still_running & set(state["tasks"]):
+                run_state.kill_run(state, debug)
+    print(f"[INFO] Cancelled {len(cancelled)} task(s) of {batch_id} ({len(running)} running)")
+    if cancelled and not running:
+        notify_if_finished(batch_id, queue_file, debug)
+    return cancelled
+
+def notify_if_finished(batch_id, queue_file=None, debug=False):
+    # With a run still going the scheduler reports the batch when that run ends;
+    # otherwise nothing else will, so the cancel that finishes a batch sends its summary
+    import run_scheduler_mission
+    counts = queue_store.read_counters(queue_file or QUEUE_FILE).get(batch_id)
+    rows = [row for row in queue_store.read_snapshot(queue_file or QUEUE_FILE, batch_id)[1] if row[3] == batch_id]
+    if counts and rows and queue_store.batch_finished(counts):
+        run_scheduler_mission.notify_batch(batch_id, counts, rows, rows[0][1], rows[0][2], [], debug=debug)
+
+def set_status(batch_id, old_status, new_status, queue_file=None):
+    def change(row):
+        if row[3] == batch_id and row[6] == old_status:
+            row[6] = new_status
+            return True
+        return False
+
+    changed = queue_store.modify_tasks(change, queue_file or QUEUE_FILE)
+    print(f"[INFO] {batch_id}: {len(changed)} task(s) {old_status} -> {new_status}")
+    return changed
+
+def set_priority(batch_id, task=None, value=None, bump=None, queue_file=None):
+    def change(row):
+        if not task_matches(row, batch_id, task) or row[6] not in ("PENDING", "PAUSED"):
+            return False
+        queue_store.pad_row(row)
+        row[8] = str(value if value is not None else queue_store.task_priority(row) + bump)
+        return True
+
+    changed = queue_store.modify_tasks(change, queue_file or QUEUE_FILE)
+    print(f"[INFO] Reprioritized {len(changed)} waiting task(s) of {batch_id}")
+    return changed
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Query the STIL conversion queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    status = sub.add_parser("status", help="Per-batch counts of unfinished batches")
+    status.add_argument("--all", action="store_true", help="Include finished batches")
+    lst = sub.add_parser("list", help="List tasks")
+    lst.add_argument("--user")
+    lst.add_argument("--batch")
+    lst.add_argument("--status", help="PENDING, RUNNING, PAUSED, COMPLETE, FAILED or CANCELLED")
+    lst.add_argument("--limit", type=int, help="Only the last N matching tasks")
+    show = sub.add_parser("show", help="Show one task and its logs")
+    show.add_argument("batch_id")
+    show.add_argument("task", help="STIL path or part of its file name")
+    tail = sub.add_parser("tail", help="Print the end of a batch or task log")
+    tail.add_argument("batch_id")
+    tail.add_argument("task", nargs="?", help="STIL path or part of its file name")
+    tail.add_argument("-n", type=int, default=50, help="Number of lines (default 50)")
+    eta = sub.add_parser("eta", help="Estimate when queued batches finish")
+    eta.add_argument("batch_id", nargs="?")
+    cancel = sub.add_parser("cancel", help="Cancel waiting and running tasks of a batch")
+    cancel.add_argument("batch_id")
+    cancel.add_argument("task", nargs="?", help="STIL path or part of its file name (default: whole batch)")
+    pause = sub.add_parser("pause", help="Hold the pending tasks of a batch")
+    pause.add_argument("batch_id")
+    resume = sub.add_parser("resume", help="Release a paused batch")
+    resume.add_argument("batch_id")
+    prio = sub.add_parser("priority", help="Set or bump the priority of waiting tasks (higher runs first)")
+    prio.add_argument("batch_id")
+    prio.add_argument("task", nargs="?", help="STIL path or part of its file name (default: whole batch)")
+    level = prio.add_mutually_exclusive_group(required=True)
+    level.add_argument("--set", type=queue_store.parse_priority, dest="value", help="Priority class or integer")
+    level.add_argument("--bump", type=int)
+    parser.add_argument("--debug", action="store_true", help="Enable debug logs")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        show_status(args.all)
+    elif args.command == "list":
+        list_tasks(args.user, args.batch, args.status, args.limit)
+    elif args.command == "show":
+        sys.exit(0 if show_task(args.batch_id, args.task) else 1)
+    elif args.command == "tail":
+        logs = log_store.find_logs(args.batch_id, args.task)
+        if not logs:
+            print(f"[ERROR] No logs found for {args.batch_id} {args.task or ''}".rstrip())
+            sys.exit(1)
+        log_store.stream_log(logs[-1], tail=args.n)
+    elif args.command == "eta":
+        show_eta(args.batch_id)
+    elif args.command == "cancel":
+        cancel_tasks(args.batch_id, args.task, debug=args.debug)
+    elif args.command == "pause":
+        set_status(args.batch_id, "PENDING", "PAUSED")
+    elif args.command == "resume":
+        set_status(args.batch_id, "PAUSED", "PENDING")
+    else:
+        set_priority(args.batch_id, args.task, args.value, args.bump)
@@ -1,19 +1,216 @@
+import ast
 import csv
+import fnmatch
 import getpass
+import io
 import os
 import sys
 import fcntl
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from config import EXECUTION_LOG_FILE, MAX_LICENSE
+import deadlines
+import queue_store
+from queue_store import QUEUE_FILE, QUEUE_HEADER, encode_overrides
+import setup_check
+import setup_tuning
 
-QUEUE_FILE = "/work/kimhuang/1_Python/8_stilManager/task_queue.csv"
 VALID_XMODES = ["", "4"]  # 定義有效 xmode 值
+DEFAULT_GLOB = "*.stil.gz"
+SCAN_WORKERS = 8  # directory listings are I/O bound on the shared filesystem
 
-def generate_batch_id(input_csv):
-    base = os.path.splitext(os.path.basename(input_csv))[0]
+def generate_batch_id(source, experiment=False):
+    # `source` is the input CSV or any name for the submission
+    base = os.path.splitext(os.path.basename(source))[0]
     timestamp = datetime.now().strftime("%y%m%d_%H%M")
-    return f"{base}_{timestamp}"
+    prefix = setup_tuning.TUNING_BATCH_PREFIX if experiment else ""
+    return f"{prefix}{base}_{timestamp}"
 
-def validate_and_append(input_csv, xmode="", queue_file=QUEUE_FILE, debug=False):
+def parse_override_value(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+def override_columns(fieldnames, debug=False):
+    # Extra CSV columns named after setup keys become per-task setup overrides
+    _, known_keys = setup_check.template_schema()
+    columns = []
+    for name in fieldnames:
+        if name == "STIL_Path":
+            continue
+        if name in known_keys:
+            columns.append(name)
+        else:
+            print(f"[WARN] Ignoring column '{name}': not a known setup key")
+    if debug:
+        print(f"[DEBUG] Setup override columns: {columns}")
+    return columns
+
+def row_overrides(row, columns):
+    return {name: parse_override_value(row[name].strip()) for name in columns if (row.get(name) or "").strip()}
+
+def check_stil_path(path):
+    # Returns an error message, or "" when the path can be queued
+    if not path:
+        return "Missing STIL file path"
+    if not os.path.isabs(path):
+        return f"STIL_Path must be an absolute path: {path}"
+    if not os.path.isfile(path):
+        return f"STIL file not found at specified path: {path}"
+    if os.path.realpath(path) != os.path.abspath(path):
+        return f"STIL file path does not match its actual location: {path}"
+    return ""
+
+def unique_batch_id(batch_id, counters):
+    # Same source submitted twice within a minute gets _2, _3, ...
+    candidate, n = batch_id, 1
+    while candidate in counters:
+        n += 1
+        candidate = f"{batch_id}_{n}"
+    return candidate
+
+def submit_batch(paths, xmode="", name="submit", overrides=None, queue_file=QUEUE_FILE, experiment=False,
+                 priority=0, user=None, deadline="", debug=False):
+    # `paths` is any iterable of STIL paths or (path, overrides) pairs; `overrides` applies to
+    # plain paths. Everything is validated before the queue is locked, and all rows go in
+    # with one write. Returns (batch_id, added), or (None, 0) when nothing was queued.
+    if xmode not in VALID_XMODES:
+        print(f"[ERROR] Invalid xmode: {xmode}. Must be one of {VALID_XMODES}")
+        return None, 0
+    schema = setup_check.template_schema()[1]
+    user = user or getpass.getuser()
+    email = f"{user}@rivosinc.com"
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    rows = []
+    for idx, item in enumerate(paths):
+        path, task_overrides = (item, overrides or {}) if isinstance(item, str) else item
+        path = path.strip()
+        if debug:
+            print(f"[DEBUG] Checking task {idx+1}: {path} {task_overrides}")
+        error = check_stil_path(path)
+        if error:
+            print(f"[ERROR] {error}")
+            print("[ABORT] Submit failed.")
+            return None, 0
+        problems = setup_check.validate_values(task_overrides, schema)
+        if problems:
+            print(f"[ERROR] Invalid setup override for {path}: {'; '.join(problems)}")
+            print("[ABORT] Submit failed.")
+            return None, 0
+        # Experiments queue one task per setup variant of the same pattern
+        variants = setup_tuning.experiment_variants(task_overrides) if experiment else [task_overrides]
+        for variant in variants:
+            rows.append([now, user, email, None, path, xmode, "PENDING", encode_overrides(variant), priority, deadline])
+    if not rows:
+        print("[ERROR] No STIL files to submit")
+        return None, 0
+
+    with open(queue_file, "a+", newline='') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        counters = queue_store.load_counters(f, queue_file=queue_file)
+        batch_id = unique_batch_id(generate_batch_id(name, experiment), counters)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if os.fstat(f.fileno()).st_size == 0:
+            writer.writerow(QUEUE_HEADER)
+        for row in rows:
+            row[3] = batch_id
+        writer.writerows(rows)
+        f.write(buffer.getvalue())
+        f.flush()
+        os.fsync(f.fileno())
+        queue_store.count_transition(counters, batch_id, None, "PENDING", len(rows))
+        queue_store.save_counters(f, counters, queue_file)
+        fcntl.flock(f, fcntl.LOCK_UN)
+    if debug:
+        print(f"[DEBUG] User: {user}, Email: {email}, BatchID: {batch_id}, XMode: {xmode}")
+    if deadline:
+        warn_if_late(batch_id, deadline, queue_file)
+    return batch_id, len(rows)
+
+def warn_if_late(batch_id, deadline, queue_file=QUEUE_FILE):
+    # Advisory only: the batch is queued either way
+    _, tasks = queue_store.read_snapshot(queue_file)
+    estimate = deadlines.duration_estimator(EXECUTION_LOG_FILE)
+    finish, on_time = deadlines.projected_finish(tasks, batch_id, estimate, MAX_LICENSE)
+    if finish is None:
+        return
+    eta = datetime.fromtimestamp(finish).strftime("%Y-%m-%d %H:%M")
+    if finish > datetime.strptime(deadline, "%Y-%m-%d %H:%M").timestamp() or not on_time:
+        print(f"[WARN] Deadline {deadline} for {batch_id} is likely to be missed: estimated completion {eta} "
+              f"(scheduler in --edf mode; later without it)")
+    else:
+        print(f"[INFO] Estimated completion {eta}, deadline {deadline} (with the scheduler in --edf mode)")
+
+def scan_directory(path, pattern, exclude):
+    # One directory level: (matching files with size and mtime, subdirectories to descend)
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if any(fnmatch.fnmatch(entry.path, pat) for pat in exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and fnmatch.fnmatch(entry.name, pattern):
+                    st = entry.stat(follow_symlinks=False)
+                    files.append((entry.path, st.st_size, st.st_mtime_ns))
+    except OSError as e:
+        print(f"[WARN] Cannot scan {path}: {e}")
+    return files, subdirs
+
+def discover_stil_files(roots, pattern=DEFAULT_GLOB, include=(), exclude=(), workers=SCAN_WORKERS, debug=False):
+    # Every directory listing is its own job, so wide trees are listed concurrently.
+    # `include`/`exclude` are shell patterns on the full path; exclude also prunes directories.
+    found = []
+    scanned = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(scan_directory, os.path.abspath(root), pattern, exclude) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                scanned += 1
+                found.extend(files)
+                pending |= {pool.submit(scan_directory, subdir, pattern, exclude) for subdir in subdirs}
+    if include:
+        found = [item for item in found if any(fnmatch.fnmatch(item[0], pat) for pat in include)]
+    if debug:
+        print(f"[DEBUG] Scanned {scanned} director(ies), {len(found)} file(s) match")
+    return sorted(found)
+
+def submit_directory(roots, pattern=DEFAULT_GLOB, include=(), exclude=(), xmode="", queue_file=QUEUE_FILE,
+                     experiment=False, workers=SCAN_WORKERS, priority=0, deadline="", debug=False):
+    found = discover_stil_files(roots, pattern, include, exclude, workers, debug)
+    completed = {} if experiment else queue_store.completed_inputs(queue_file)
+    paths, skipped = [], 0
+    for path, size, mtime_ns in found:
+        error = check_stil_path(path)
+        if error:
+            print(f"[WARN] Skipping: {error}")
+            continue
+        if completed.get((path, xmode)) == (size, mtime_ns):
+            skipped += 1
+            if debug:
+                print(f"[DEBUG] Already converted, unchanged: {path}")
+            continue
+        paths.append(path)
+    print(f"[INFO] Found {len(found)} file(s) matching {pattern}; {skipped} already converted and unchanged.")
+    if not paths:
+        print("[INFO] Nothing to submit.")
+        return None, 0
+    name = os.path.basename(os.path.normpath(roots[0]))
+    batch_id, added = submit_batch(paths, xmode, name, queue_file=queue_file, experiment=experiment, priority=priority,
+                                   deadline=deadline, debug=debug)
+    if batch_id:
+        print(f"[INFO] Submit successful. BatchID: {batch_id}")
+        print(f"[INFO] Added {added} task(s).")
+    return batch_id, added
+
+def validate_and_append(input_csv, xmode="", queue_file=QUEUE_FILE, debug=False, experiment=False, priority=0,
+                        deadline=""):
     if not os.path.isfile(input_csv):
         print(f"[ERROR] CSV file not found: {input_csv}")
         sys.exit(1)
@@ -23,69 +220,52 @@ def validate_and_append(input_csv, xmode="", queue_file=QUEUE_FILE, debug=False)
         print(f"[ERROR] Invalid xmode: {xmode}. Must be one of {VALID_XMODES}")
         sys.exit(1)
 
-    user = getpass.getuser()
-    email = f"{user}@rivosinc.com"
-    batch_id = generate_batch_id(input_csv)
-
     if debug:
         print(f"[DEBUG] Opening input CSV: {input_csv}")
-        print(f"[DEBUG] User: {user}, Email: {email}, BatchID: {batch_id}, XMode: {xmode}")
 
     with open(input_csv, newline='') as f:
         reader = csv.DictReader(f)
-        tasks = list(reader)
         if debug:
             print(f"[DEBUG] CSV headers: {reader.fieldnames}")
-            print(f"[DEBUG] Loaded {len(tasks)} task(s) from CSV")
-
-    if "STIL_Path" not in reader.fieldnames:
-        print("[ERROR] Input CSV must contain header: STIL_Path")
-        sys.exit(1)
-
-    for idx, row in enumerate(tasks):
-        if debug:
-            print(f"[DEBUG] Checking task {idx+1}: {row}")
-        path = row.get("STIL_Path", "").strip()
-        if not path:
-            print("[ERROR] Missing STIL file path")
-            print("[ABORT] Submit failed.")
-            return
-        if not os.path.isabs(path):
-            print(f"[ERROR] STIL_Path must be an absolute path: {path}")
-            print("[ABORT] Submit failed.")
-            return
-        if not os.path.isfile(path):
-            print(f"[ERROR] STIL file not found at specified path: {path}")
-            print("[ABORT] Submit failed.")
-            return
-        if os.path.realpath(path) != os.path.abspath(path):
-            print(f"[ERROR] STIL file path does not match its actual location: {path}")
-            print("[ABORT] Submit failed.")
-            return
-
-    try:
-        file_exists = os.path.exists(queue_file)
-        with open(queue_file, "a+", newline='') as f:
-            fcntl.flock(f, fcntl.LOCK_EX)
-            writer = csv.writer(f)
-            if not file_exists or os.stat(queue_file).st_size == 0:
-                writer.writerow(["Timestamp", "SubmittedBy", "Email", "BatchID", "STIL_Path", "XMode", "Status"])
-            for row in tasks:
-                now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                writer.writerow([now, user, email, batch_id, row["STIL_Path"], xmode, "PENDING"])
-            fcntl.flock(f, fcntl.LOCK_UN)
+        if "STIL_Path" not in (reader.fieldnames or []):
+            print("[ERROR] Input CSV must contain header: STIL_Path")
+            sys.exit(1)
+        columns = override_columns(reader.fieldnames, debug)
+        tasks = ((row.get("STIL_Path") or "", row_overrides(row, columns)) for row in reader)
+        try:
+            batch_id, added = submit_batch(tasks, xmode, input_csv, queue_file=queue_file, experiment=experiment,
+                                           priority=priority, deadline=deadline, debug=debug)
+        except Exception as e:
+            print(f"[ERROR] Failed to write to queue: {e}")
+            sys.exit(1)
+    if batch_id:
         print(f"[INFO] Submit successful. BatchID: {batch_id}")
-        print(f"[INFO] Added {len(tasks)} task(s).")
-    except Exception as e:
-        print(f"[ERROR] Failed to write to queue: {e}")
-        sys.exit(1)
+        print(f"[INFO] Added {added} task(s).")
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument("input_csv", help="CSV file with STIL paths")
+    parser.add_argument("input_csv", nargs="?", help="CSV file with STIL paths")
+    parser.add_argument("--dir", action="append", default=[], help="Submit STIL files found under this directory (repeatable)")
+    parser.add_argument("--glob", default=DEFAULT_GLOB, help=f"File name pattern for --dir (default {DEFAULT_GLOB})")
+    parser.add_argument("--include", action="append", default=[], help="Only full paths matching this pattern (repeatable)")
+    parser.add_argument("--exclude", action="append", default=[], help="Skip full paths matching this pattern (repeatable)")
+    parser.add_argument("--jobs", type=int, default=SCAN_WORKERS, help="Concurrent directory scans")
+    parser.add_argument("--priority", type=queue_store.parse_priority, default=0,
+                        help=f"Priority class ({', '.join(queue_store.PRIORITY_CLASSES)}) or integer; higher runs first")
+    parser.add_argument("--deadline", type=deadlines.parse_deadline,
+                        help="Wanted completion time, 'YYYY-mm-dd HH:MM' (used by the scheduler's --edf mode)")
     parser.add_argument("--xmode", help="Specify xmode (e.g. 4)", default="")
+    parser.add_argument("--experiment", action="store_true",
+                        help="Queue every setup tuning variant of each pattern (outputs go to the experiment area)")
     parser.add_argument("--debug", action="store_true", help="Enable debug logs")
     args = parser.parse_args()
 
-    validate_and_append(args.input_csv, xmode=args.xmode, debug=args.debug)
+    if bool(args.input_csv) == bool(args.dir):
+        parser.error("give either an input CSV or --dir")
+    if args.dir:
+        submit_directory(args.dir, args.glob, args.include, args.exclude, args.xmode, experiment=args.experiment,
+                         workers=args.jobs, priority=args.priority, deadline=args.deadline or "", debug=args.debug)
+    else:
+        validate_and_append(args.input_csv, xmode=args.xmode, debug=args.debug, experiment=args.experiment,
+                            priority=args.priority, deadline=args.deadline or "")
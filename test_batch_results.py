@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+import unittest
+import run_scheduler_mission
+
+class SplitBatchResultsTest(unittest.TestCase):
+    # Pattern names in one batch often differ only by a trailing counter (..._061025_1, ..._061025_10)
+
+    def setUp(self):
+        self.project_dir = tempfile.mkdtemp(prefix="stil_split_test_")
+        self.paths = ["/in/pat_a_1.stil.gz", "/in/pat_a_10.stil.gz"]
+
+    def tearDown(self):
+        shutil.rmtree(self.project_dir, ignore_errors=True)
+
+    def produce(self, *names):
+        for name in names:
+            open(os.path.join(self.project_dir, name), "w").close()
+
+    def test_output_of_a_longer_name_does_not_complete_a_shorter_one(self):
+        self.produce("pat_a_10_0.pat")
+        results = run_scheduler_mission.split_batch_results(self.paths, self.project_dir, True, "")
+        self.assertEqual(results, {"/in/pat_a_1.stil.gz": "FAILED", "/in/pat_a_10.stil.gz": "COMPLETE"})
+
+    def test_error_naming_a_longer_name_blames_only_that_pattern(self):
+        results = run_scheduler_mission.split_batch_results(self.paths, self.project_dir, False,
+                                                            "ERROR: conversion of pat_a_10 failed")
+        self.assertEqual(results, {"/in/pat_a_1.stil.gz": "PENDING", "/in/pat_a_10.stil.gz": "FAILED"})
+
+    def test_both_patterns_produced(self):
+        self.produce("pat_a_1_0.pat", "pat_a_10_0.pat")
+        results = run_scheduler_mission.split_batch_results(self.paths, self.project_dir, True, "")
+        self.assertEqual(set(results.values()), {"COMPLETE"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import csv
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+TASK_SEC = 2.0
+
+class LeaseFencingTest(unittest.TestCase):
+    # Two scheduler processes on one queue in a scratch tree: worker A loses its lease mid-run,
+    # worker B reclaims and runs the task again; only one of them may publish
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="stil_fence_test_")
+        self.env = {**os.environ, "STIL_MANAGER_DIR": self.dir, "STIL_RELEASE_DIR": os.path.join(self.dir, "release")}
+        shutil.copy(os.path.join(REPO_DIR, "normal.py"), self.dir)
+        with open(os.path.join(self.dir, "repack_config.json"), "w") as f:
+            json.dump({"executor": {"mean_sec": TASK_SEC, "sigma": 0.0, "output_files": 1, "output_bytes": 64},
+                       "notify": {"default": {"sinks": []}}}, f)
+        os.makedirs(os.path.join(self.dir, "stil"))
+        self.stil_path = os.path.join(self.dir, "stil", "fence_pattern.stil.gz")
+        with open(self.stil_path, "wb") as f:
+            f.write(b"\x1f\x8b" + os.urandom(64))
+        self.queue_file = os.path.join(self.dir, "task_queue.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def script(self, name, *args):
+        return [sys.executable, os.path.join(REPO_DIR, name), *args]
+
+    def worker(self):
+        return subprocess.Popen(self.script("run_scheduler_mission.py", "--worker", "--executor", "simulated", "--debug"),
+                                env=self.env, cwd=self.dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                universal_newlines=True)
+
+    def queue_rows(self):
+        with open(self.queue_file, newline='') as f:
+            return list(csv.reader(f))[1:]
+
+    def wait_for_status(self, status, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if any(row[6] == status for row in self.queue_rows()):
+                return
+            time.sleep(0.05)
+        self.fail(f"no task reached {status} within {timeout}s")
+
+    def expire_leases(self):
+        # As if worker A had stopped renewing: the next worker reclaims the task
+        with open(self.queue_file, "r+", newline='') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            rows = list(csv.reader(f))
+            for row in rows[1:]:
+                if row[6] == "RUNNING":
+                    row[11] = "1"
+            f.seek(0)
+            f.truncate()
+            csv.writer(f).writerows(rows)
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+    def test_lost_lease_is_not_published(self):
+        subprocess.run(self.script("stilsubmit.py", "--dir", os.path.dirname(self.stil_path)), env=self.env,
+                       cwd=self.dir, check=True, stdout=subprocess.DEVNULL)
+        worker_a = self.worker()
+        self.wait_for_status("RUNNING")
+        self.expire_leases()
+        worker_b = self.worker()
+        output_a, _ = worker_a.communicate(timeout=60)
+        output_b, _ = worker_b.communicate(timeout=60)
+
+        self.assertIn("lost before publishing", output_a)
+        self.assertNotIn("[DEBUG] Published", output_a)
+        self.assertEqual(output_b.count("[DEBUG] Published"), 1, output_b)
+        self.assertEqual([row[6] for row in self.queue_rows()], ["COMPLETE"])
+        with open(os.path.join(self.dir, "execution_log.csv"), newline='') as f:
+            statuses = sorted(row["Status"] for row in csv.DictReader(f) if row["STIL_Path"] == self.stil_path)
+        self.assertEqual(statuses, ["COMPLETE", "LEASE_LOST"])
+        manifests = [name for _, _, files in os.walk(os.path.join(self.dir, "manifests")) for name in files]
+        self.assertEqual(len(manifests), 1)
+
+if __name__ == "__main__":
+    unittest.main()
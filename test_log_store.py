@@ -0,0 +1,42 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+import log_store
+
+class ExecutionLogRotationTest(unittest.TestCase):
+    # Estimators read recent history; a monthly rotation must not leave them with an empty log
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="stil_log_test_")
+        self.path = os.path.join(self.dir, "execution_log.csv")
+        with open(self.path, "w", newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["StartTime", "Status", "Duration_sec"])
+            for n in range(100):
+                writer.writerow(["2020-01-01 00:00:00", "COMPLETE", n])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_recent_rows_survive_rotation(self):
+        with log_store.lock_execution_log(self.path):
+            rotated = log_store.rotate_execution_log(self.path)
+        self.assertTrue(rotated.endswith(".csv.gz"))
+        self.assertFalse(os.path.exists(self.path))
+        rows = log_store.recent_execution_rows(self.path, 1024)
+        self.assertTrue(rows)
+        self.assertEqual(rows[-1]["Duration_sec"], "99")
+
+    def test_live_rows_follow_rotated_tail(self):
+        with log_store.lock_execution_log(self.path):
+            log_store.rotate_execution_log(self.path)
+        with open(self.path, "w", newline='') as f:
+            csv.writer(f).writerows([["StartTime", "Status", "Duration_sec"], ["2020-02-01 00:00:00", "COMPLETE", 100]])
+        rows = log_store.recent_execution_rows(self.path, 1024)
+        self.assertEqual([row["Duration_sec"] for row in rows[-2:]], ["99", "100"])
+        self.assertEqual(len(log_store.rotated_execution_logs(self.path)), 1)  # the kept tail is not a rotation
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+import output_report
+
+class VectorMemoryTest(unittest.TestCase):
+    # smt8_vector_memory_summary lines as ategen prints them, with pattern names full of digits
+
+    def test_total_line(self):
+        usage = output_report.vector_memory_by_pattern("INFO: Vector memory usage: 1,234,567\n",
+                                                       ["rva_q_int_sa_chain_x0_scan_061025_1"])
+        self.assertEqual(usage, {"": 1234567})
+
+    def test_per_pattern_lines(self):
+        bases = ["rva_q_int_sa_chain_x0_scan_061025_1", "rva_q_int_sa_chain_x0_scan_061025_10"]
+        text = ("INFO: Vector memory usage of rva_q_int_sa_chain_x0_scan_061025_1: 1,234,567\n"
+                "INFO: Vector memory usage of rva_q_int_sa_chain_x0_scan_061025_10: 2,000 vectors (12%)\n"
+                "INFO: Writing rva_q_int_sa_chain_x0_scan_061025_1_0.binl\n")
+        usage = output_report.vector_memory_by_pattern(text, bases)
+        self.assertEqual(usage, {bases[0]: 1234567, bases[1]: 2000})
+
+    def test_pattern_named_after_the_count(self):
+        usage = output_report.vector_memory_by_pattern(
+            "Vector memory usage = 4,096 (pattern rva_x0_061025_1)\n", ["rva_x0_061025_1"])
+        self.assertEqual(usage, {"rva_x0_061025_1": 4096})
+
+if __name__ == "__main__":
+    unittest.main()